@@ -6,6 +6,13 @@ downloads the files, and rewrites the message to include the local file path.
 
 __version__ = "0.1.0"
 
-from telegram_media_hook.hook import TelegramMediaHook
-
 __all__ = ["TelegramMediaHook"]
+
+
+def __getattr__(name: str):
+    # Imported lazily so CLI commands don't pay for httpx at startup
+    if name == "TelegramMediaHook":
+        from telegram_media_hook.hook import TelegramMediaHook
+
+        return TelegramMediaHook
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,120 +1,173 @@
 """CLI for Telegram Media Hook."""
 
+import argparse
 import asyncio
 import logging
+import os
 import sys
-import json
-import click
-from pathlib import Path
-from telegram_media_hook.config import get_config
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+from typing import Optional
+
 logger = logging.getLogger(__name__)
 
 
-@click.group()
-def cli():
-    """Telegram Media Hook CLI."""
-    pass
+def configure_logging() -> None:
+    """Set up INFO-level logging for commands that do real work."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
 
 
-@cli.command()
-def test():
+def test(args: argparse.Namespace) -> None:
     """Test the hook configuration."""
+    from telegram_media_hook.config import get_config
+
     config = get_config()
 
     is_valid, error = config.validate()
 
     if is_valid:
-        click.echo(f"✅ Configuration valid")
-        click.echo(f"   Workspace: {config.workspace_root}")
-        click.echo(f"   Upload dir: {config.upload_path}")
+        print(f"✅ Configuration valid")
+        print(f"   Workspace: {config.workspace_root}")
+        print(f"   Upload dir: {config.upload_path}")
     else:
-        click.echo(f"❌ Configuration error: {error}", err=True)
+        print(f"❌ Configuration error: {error}", file=sys.stderr)
         sys.exit(1)
 
 
-@cli.command()
-@click.argument("update_file", type=click.Path(exists=True))
-def process(update_file: str):
+def process(args: argparse.Namespace) -> None:
     """Process a Telegram update from file."""
+    from telegram_media_hook.serialization import dumps, loads
+
+    configure_logging()
+
     async def run():
-        with open(update_file) as f:
-            update = json.load(f)
+        with open(args.update_file, "rb") as f:
+            update = loads(f.read())
 
         from telegram_media_hook import TelegramMediaHook
+
         hook = TelegramMediaHook()
-        result = await hook.handle_update(update)
+        try:
+            result = await hook.handle_update(update)
+        finally:
+            await hook.telegram_client.aclose()
 
         if result:
-            print(json.dumps(result, default=str, indent=2))
+            print(dumps(result, indent=True).decode())
         else:
             print("No media found in update")
 
     asyncio.run(run())
 
 
-@cli.command()
-@click.option("--port", default=8081, help="Port to listen on")
-def queue_server(port: int):
+def queue_server(args: argparse.Namespace) -> None:
     """Start the queue API server.
-    
+
     Gateway calls this to add file_ids to the queue.
     """
     from telegram_media_hook.queue_api import run_server
-    click.echo(f"🚀 Starting queue API server on http://127.0.0.1:{port}")
-    click.echo(f"   Add to queue: POST /add")
-    click.echo(f"   Status: GET /status")
-    run_server(port)
+
+    configure_logging()
+    print(f"🚀 Starting queue API server on http://127.0.0.1:{args.port}")
+    print(f"   Add to queue: POST /add")
+    print(f"   Status: GET /status")
+    run_server(args.port)
 
 
-@cli.command()
-def mcp():
+def mcp(args: argparse.Namespace) -> None:
     """Start the MCP server."""
     from telegram_media_hook.mcp_server import main
+
+    configure_logging()
     main()
 
 
-@cli.command()
-@click.argument("file_id")
-@click.option("--message-id", default=0, type=int)
-@click.option("--chat-id", default=0, type=int)
-@click.option("--caption", default="")
-def queue_add(file_id: str, message_id: int, chat_id: int, caption: str):
+def queue_add(args: argparse.Namespace) -> None:
     """Manually add a file_id to the queue."""
     from telegram_media_hook.mcp_server import add_to_queue
-    
+    from telegram_media_hook.serialization import dumps
+
     async def run():
-        result = await add_to_queue(file_id, message_id, chat_id, caption)
-        print(json.dumps(result, indent=2))
-    
+        result = await add_to_queue(args.file_id, args.message_id, args.chat_id, args.caption)
+        print(dumps(result, indent=True).decode())
+
     asyncio.run(run())
 
 
-@cli.command()
-def queue_status():
+def queue_status(args: argparse.Namespace) -> None:
     """Show queue status."""
     from telegram_media_hook.mcp_server import list_pending_media
-    
+    from telegram_media_hook.serialization import dumps
+
     async def run():
         result = await list_pending_media()
-        print(json.dumps(result, indent=2))
-    
+        print(dumps(result, indent=True).decode())
+
     asyncio.run(run())
 
 
-@cli.command()
-@click.option("--max-age", default=30, help="Maximum age in days")
-def cleanup(max_age: int):
-    """Clean up old uploaded files."""
+def cleanup(args: argparse.Namespace) -> None:
+    """Clean up old uploaded files and compact the queue."""
     from telegram_media_hook.file_manager import FileManager
+    from telegram_media_hook.queue_service import compact
 
+    configure_logging()
+    # Compact first, so the queue is fully on disk before anything is deleted
+    folded, expired = compact(args.max_age)
+    print(f"Compacted queue ({folded} log records folded in, {expired} old entries archived)")
     file_manager = FileManager()
-    deleted = file_manager.cleanup_old_files(max_age)
-    click.echo(f"Deleted {deleted} old files")
+    deleted = file_manager.cleanup_old_files(args.max_age)
+    print(f"Deleted {deleted} old files")
+
+
+def _existing_file(value: str) -> str:
+    if not os.path.exists(value):
+        raise argparse.ArgumentTypeError(f"Path '{value}' does not exist.")
+    return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one subcommand per CLI command."""
+    parser = argparse.ArgumentParser(
+        prog="telegram-media-hook",
+        description="Telegram Media Hook CLI.",
+    )
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    def add(name: str, func) -> argparse.ArgumentParser:
+        summary = func.__doc__.splitlines()[0]
+        command = sub.add_parser(name, help=summary, description=func.__doc__)
+        command.set_defaults(func=func)
+        return command
+
+    add("test", test)
+
+    command = add("process", process)
+    command.add_argument("update_file", type=_existing_file)
+
+    command = add("queue-server", queue_server)
+    command.add_argument("--port", type=int, default=8081, help="Port to listen on")
+
+    add("mcp", mcp)
+
+    command = add("queue-add", queue_add)
+    command.add_argument("file_id")
+    command.add_argument("--message-id", type=int, default=0)
+    command.add_argument("--chat-id", type=int, default=0)
+    command.add_argument("--caption", default="")
+
+    add("queue-status", queue_status)
+
+    command = add("cleanup", cleanup)
+    command.add_argument("--max-age", type=int, default=30, help="Maximum age in days")
+
+    return parser
+
+
+def cli(argv: Optional[list[str]] = None) -> None:
+    """Telegram Media Hook CLI."""
+    args = build_parser().parse_args(argv)
+    args.func(args)
 
 
 if __name__ == "__main__":
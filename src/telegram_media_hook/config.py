@@ -1,38 +1,104 @@
 """Configuration for Telegram Media Hook."""
 
+import logging
 import os
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from dataclasses import dataclass
 from typing import Optional
-from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
 
+# Project directory (for a source checkout) and the Pi deployment location
+_SCRIPT_DIR = Path(__file__).parent.parent.parent
+_WORKSPACE_ENV_DIR = "/home/openclaw/.openclaw/workspace/telegram_media_hook"
+
+
+@lru_cache(maxsize=1)
 def find_env_file() -> Path:
-    """Find the .env file in the project directory."""
-    # Check current directory first
-    current = Path.cwd() / ".env"
-    if current.exists():
-        return current
-
-    # Check script directory
-    script_dir = Path(__file__).parent.parent.parent
-    env_file = script_dir / ".env"
-    if env_file.exists():
-        return env_file
-
-    # Check workspace telegram_media_hook directory
-    workspace = Path("/home/openclaw/.openclaw/workspace/telegram_media_hook")
-    env_file = workspace / ".env"
-    if env_file.exists():
-        return env_file
+    """Find the .env file in the project directory.
+
+    Candidates are checked in order (current directory, project directory,
+    workspace directory) and the result is memoized for the process.
+    """
+    candidates = (
+        os.path.join(os.getcwd(), ".env"),
+        os.path.join(_SCRIPT_DIR, ".env"),
+        os.path.join(_WORKSPACE_ENV_DIR, ".env"),
+    )
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return Path(candidate)
 
     # Return default location for creation
-    return script_dir / ".env"
+    return _SCRIPT_DIR / ".env"
+
+
+def load_env_file(path: Path) -> None:
+    """Load KEY=VALUE lines from a .env file into os.environ.
+
+    Existing environment variables take precedence, as with python-dotenv.
+    Supports comments, blank lines, an optional ``export`` prefix, quoted
+    values and `` #`` inline comments. python-dotenv's ``${VAR}``
+    interpolation, escape sequences in double quotes and multi-line quoted
+    values are not supported; such keys are skipped with a warning rather
+    than set to a misparsed value.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read().decode("utf-8")
+    except OSError:
+        return
+
+    lines = iter(data.splitlines())
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export ") :].lstrip()
+
+        key, sep, value = line.partition("=")
+        key = key.strip()
+        if not sep or not key:
+            continue
+
+        value = value.strip()
+        quote = value[:1] if value[:1] in ("'", '"') else ""
+        if quote:
+            # A quoted value ends at its closing quote; anything after it
+            # (e.g. a " # comment") is ignored
+            end = value.find(quote, 1)
+            if end == -1:
+                # Skip the continuation lines too, up to the closing quote
+                for rest in lines:
+                    if quote in rest:
+                        break
+                _skip_env_key(path, key, "multi-line values")
+                continue
+            value = value[1:end]
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+
+        if quote == '"' and "\\" in value:
+            _skip_env_key(path, key, "escape sequences")
+            continue
+        if quote != "'" and "${" in value:
+            _skip_env_key(path, key, "${VAR} interpolation")
+            continue
+        os.environ.setdefault(key, value)
 
 
-@dataclass
+def _skip_env_key(path: Path, key: str, construct: str) -> None:
+    logger.warning("%s: %s not loaded; %s are not supported in .env files", path, key, construct)
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration for the Telegram Media Hook."""
+    """Configuration for the Telegram Media Hook.
+
+    Immutable, so derived paths are computed once in __post_init__.
+    """
 
     # Telegram Bot Token
     bot_token: str = ""
@@ -52,15 +118,15 @@ class Config:
     # Queue file for OpenClaw integration
     queue_file: str = "uploads/telegram_media_queue.json"
 
-    @property
-    def upload_path(self) -> Path:
-        """Get the full upload directory path."""
-        return self.workspace_root / self.upload_dir
+    # Full upload directory path (derived)
+    upload_path: Path = field(init=False)
+
+    # Full queue file path (derived)
+    queue_path: Path = field(init=False)
 
-    @property
-    def queue_path(self) -> Path:
-        """Get the full queue file path."""
-        return self.workspace_root / self.queue_file
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "upload_path", self.workspace_root / self.upload_dir)
+        object.__setattr__(self, "queue_path", self.workspace_root / self.queue_file)
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -68,7 +134,7 @@ class Config:
         # Try to load from .env file
         env_path = find_env_file()
         if env_path.exists():
-            load_dotenv(env_path)
+            load_env_file(env_path)
         elif os.getenv("TELEGRAM_BOT_TOKEN"):
             # Fall back to environment variables if .env doesn't exist
             pass
@@ -76,14 +142,13 @@ class Config:
             # Create .env from example if it doesn't exist
             example_path = env_path.parent / ".env.example"
             if example_path.exists():
-                load_dotenv(example_path)
+                load_env_file(example_path)
 
         return cls(
             bot_token=os.getenv("TELEGRAM_BOT_TOKEN", ""),
-            workspace_root=Path(os.getenv(
-                "OPENCLAW_WORKSPACE",
-                "/home/openclaw/.openclaw/workspace"
-            )),
+            workspace_root=Path(
+                os.getenv("OPENCLAW_WORKSPACE", "/home/openclaw/.openclaw/workspace")
+            ),
             upload_dir=os.getenv("UPLOAD_DIR", "uploads"),
             max_file_size_mb=int(os.getenv("MAX_FILE_SIZE_MB", "20")),
             poll_interval=int(os.getenv("POLL_INTERVAL", "1")),
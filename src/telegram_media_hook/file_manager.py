@@ -1,12 +1,115 @@
 """File manager for saving Telegram media to workspace."""
 
-import uuid
+import asyncio
+import itertools
+import os
+import re
+import time
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
 from pathlib import Path
-from datetime import datetime
 from typing import Optional
-import aiofiles
+
 from telegram_media_hook.config import get_config
 
+# pid + per-process counter keeps generated filenames unique without uuid4
+_PID = os.getpid()
+_counter = itertools.count()
+
+
+def _reset_name_state() -> None:
+    """Give a forked child its own pid and counter, so names don't collide."""
+    global _PID, _counter
+    _PID = os.getpid()
+    _counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only; Windows has no fork
+    os.register_at_fork(after_in_child=_reset_name_state)
+
+# Names produced by generate_filename: YYYYMMDD_HHMMSS_<pid>_<counter>.<ext>,
+# or YYYYMMDD_HHMMSS_<8 hex>.<ext> from older versions. cleanup_old_files
+# deletes nothing else, so the queue files kept alongside survive.
+_GENERATED_NAME = re.compile(r"\d{8}_\d{6}_[0-9a-f]+(?:_[0-9a-f]+)?\.[^.]*")
+
+# Streamed content is gathered up to this size per write, so a download
+# costs a few worker-thread hops rather than one per network chunk
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Last formatted timestamp, reused while the wall-clock second is unchanged
+_prefix_second = -1
+_prefix = ""
+
+
+def _timestamp_prefix() -> str:
+    """Return the current local time as YYYYMMDD_HHMMSS, formatted once per second."""
+    global _prefix_second, _prefix
+    now = int(time.time())
+    if now != _prefix_second:
+        _prefix = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+        _prefix_second = now
+    return _prefix
+
+
+def _open_for_write(path: Path) -> int:
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+
+def _write_fd(fd: int, content: bytes | bytearray) -> None:
+    """Write all of content to fd, handling short writes."""
+    view = memoryview(content)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _write_all(path: Path, content: bytes) -> None:
+    """Write content to path with raw os calls, handling short writes."""
+    fd = _open_for_write(path)
+    try:
+        _write_fd(fd, content)
+    finally:
+        os.close(fd)
+
+
+async def write_stream(chunks: AsyncGenerator[bytes, None], path: Path) -> int:
+    """Write streamed content to path from a worker thread.
+
+    Chunks are buffered up to WRITE_BUFFER_SIZE between writes. If the
+    stream or a write fails part-way, the partial file is removed before
+    the error propagates.
+
+    Args:
+        chunks: Async generator of content; it is closed on return or
+            failure, which releases a streamed HTTP response.
+        path: Destination; overwritten if it exists.
+
+    Returns:
+        Number of bytes written.
+    """
+    written = 0
+    async with aclosing(chunks):
+        fd = await asyncio.to_thread(_open_for_write, path)
+        try:
+            try:
+                buffer = bytearray()
+                async for chunk in chunks:
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await asyncio.to_thread(_write_fd, fd, buffer)
+                        written += len(buffer)
+                        buffer = bytearray()
+                if buffer:
+                    await asyncio.to_thread(_write_fd, fd, buffer)
+                    written += len(buffer)
+            finally:
+                os.close(fd)
+        except BaseException:
+            # Retries use a fresh filename, so a truncated file would linger
+            path.unlink(missing_ok=True)
+            raise
+    return written
+
 
 class FileManager:
     """Manages file storage in the workspace."""
@@ -19,10 +122,18 @@ class FileManager:
         """
         self.config = get_config()
         self.upload_dir = upload_dir or self.config.upload_path
+        # Workspace root with a trailing separator, for prefix checks
+        self._workspace_prefix = os.path.join(os.fspath(self.config.workspace_root), "")
+        self._dir_ready = False
 
     async def ensure_upload_dir(self) -> None:
-        """Ensure the upload directory exists."""
-        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        """Ensure the upload directory exists.
+
+        Only the first call touches the filesystem.
+        """
+        if not self._dir_ready:
+            self.upload_dir.mkdir(parents=True, exist_ok=True)
+            self._dir_ready = True
 
     def generate_filename(self, original_name: Optional[str] = None) -> str:
         """Generate a unique filename.
@@ -31,19 +142,17 @@ class FileManager:
             original_name: Original filename (optional, for extension).
 
         Returns:
-            Generated filename with UUID.
+            Generated filename: ``YYYYMMDD_HHMMSS_<pid>_<counter>.<ext>``.
         """
         # Get extension from original name or default to jpg
         ext = "jpg"
-        if original_name:
-            parts = original_name.rsplit(".", 1)
-            if len(parts) > 1:
-                ext = parts[1].lower()
+        if original_name and "." in original_name:
+            ext = original_name.rpartition(".")[2].lower()
 
-        # Generate unique name with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        return f"{timestamp}_{unique_id}.{ext}"
+        # Generate unique name with timestamp. cleanup_old_files relies on
+        # the leading YYYYMMDD to skip stat() for recent files.
+        timestamp = _timestamp_prefix()
+        return f"{timestamp}_{_PID:x}_{next(_counter):x}.{ext}"
 
     def get_file_path(self, filename: str) -> Path:
         """Get the full path for a file.
@@ -69,9 +178,25 @@ class FileManager:
         await self.ensure_upload_dir()
         file_path = self.get_file_path(filename)
 
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
+        # One thread hop for open+write+close
+        await asyncio.to_thread(_write_all, file_path, content)
+
+        return file_path
+
+    async def save_stream(self, chunks: AsyncGenerator[bytes, None], filename: str) -> Path:
+        """Save streamed file content to disk as it arrives.
 
+        Args:
+            chunks: Async generator of content chunks; closed when done.
+            filename: Filename to save as.
+
+        Returns:
+            Path to the saved file. If the stream fails part-way, the
+            partial file is removed before the error propagates.
+        """
+        await self.ensure_upload_dir()
+        file_path = self.get_file_path(filename)
+        await write_stream(chunks, file_path)
         return file_path
 
     def get_workspace_relative_path(self, file_path: Path) -> str:
@@ -83,11 +208,11 @@ class FileManager:
         Returns:
             Relative path from workspace root.
         """
-        try:
-            return str(file_path.relative_to(self.config.workspace_root))
-        except ValueError:
-            # If not relative, return the full path
-            return str(file_path)
+        path = os.fspath(file_path)
+        if path.startswith(self._workspace_prefix):
+            return path[len(self._workspace_prefix) :]
+        # If not relative, return the full path
+        return path
 
     def get_upload_dir(self) -> Path:
         """Get the upload directory path."""
@@ -96,23 +221,34 @@ class FileManager:
     def cleanup_old_files(self, max_age_days: int = 30) -> int:
         """Clean up old uploaded files.
 
+        Only files named by generate_filename are considered; the queue
+        and its sidecar files often share the upload directory and must
+        never be removed for their age.
+
         Args:
             max_age_days: Maximum age of files to keep.
 
         Returns:
             Number of files deleted.
         """
-        import time
         if not self.upload_dir.exists():
             return 0
 
         cutoff = time.time() - (max_age_days * 24 * 60 * 60)
+        cutoff_date = time.strftime("%Y%m%d", time.localtime(cutoff))
         deleted = 0
 
-        for file_path in self.upload_dir.iterdir():
-            if file_path.is_file():
-                if file_path.stat().st_mtime < cutoff:
-                    file_path.unlink()
+        # scandir reuses the dirent type and avoids a Path per entry
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if not _GENERATED_NAME.fullmatch(entry.name):
+                    continue
+                # Generated names start with their creation date; anything
+                # dated after the cutoff day is too new to need a stat()
+                if entry.name[:8] > cutoff_date:
+                    continue
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
                     deleted += 1
 
         return deleted
@@ -1,31 +1,153 @@
 """Main hook implementation for OpenClaw integration."""
 
-import json
+import asyncio
 import logging
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Awaitable, Iterable
+from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Optional
-from telegram_media_hook.config import get_config, Config
-from telegram_media_hook.telegram_client import TelegramClient
+
+from telegram_media_hook.config import Config, get_config
 from telegram_media_hook.file_manager import FileManager
+from telegram_media_hook.serialization import dumps
+from telegram_media_hook.telegram_client import TelegramClient
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent downloads across all hooks, to stay clear of FLOOD_WAIT
+MAX_CONCURRENT_DOWNLOADS = 10
+
+# Shared by every hook like _seen; a semaphore belongs to one event loop,
+# so a new one is made for each loop that downloads
+_download_semaphore: Optional[asyncio.Semaphore] = None
+_download_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Recently handled messages remembered, to skip redeliveries
+SEEN_LIMIT = 4096
+
+# (chat_id, message_id, edit_date, *file_ids) -> processing task, oldest
+# first. Shared by every hook, since process_telegram_update() makes one per
+# update. Tasks are stored before they finish, so a duplicate arriving
+# mid-download waits for it instead of downloading again; failures are
+# forgotten.
+_seen: "OrderedDict[tuple, asyncio.Task[Optional[ProcessedMessage]]]" = OrderedDict()
+
+
+# Message fields carrying downloadable media, in priority order, mapped to
+# the name whose extension is used when Telegram sends no file_name.
+# "photo" is a list of sizes; every other kind is a single file object.
+_MEDIA_DEFAULT_NAMES = {
+    "photo": "photo.jpg",
+    "video": "video.mp4",
+    "animation": "animation.mp4",
+    "audio": "audio.mp3",
+    "voice": "voice.ogg",
+    "document": "document",
+}
+_MEDIA_KEYS = frozenset(_MEDIA_DEFAULT_NAMES)
+
+# How each media kind is described in the rewritten message
+_MEDIA_LABELS = {
+    "photo": "图片",
+    "video": "视频",
+    "animation": "动图",
+    "audio": "音频",
+    "voice": "语音",
+    "document": "文件",
+}
+
+
+def find_media(message: Any) -> Optional[list[tuple[str, dict[str, Any]]]]:
+    """Find the media in a message.
+
+    Returns:
+        (kind, file_object) pairs in priority order, using the largest size
+        for photos. Empty if there is no media, None if a media field is
+        malformed.
+    """
+    if not isinstance(message, dict):
+        return None
+
+    present = _MEDIA_KEYS.intersection(message)
+    if not present:
+        return []
+
+    found = []
+    seen_ids = set()
+    for kind in _MEDIA_DEFAULT_NAMES:
+        if kind not in present:
+            continue
+        media = message[kind]
+        if kind == "photo":
+            media = media[-1] if isinstance(media, list) and media else None
+        if not isinstance(media, dict) or "file_id" not in media:
+            return None
+        # Animations are also sent as a document with the same file_id
+        if media["file_id"] in seen_ids:
+            continue
+        seen_ids.add(media["file_id"])
+        found.append((kind, media))
+    return found
+
+
+def message_chat_id(message: dict[str, Any]) -> Optional[int]:
+    """Return the id of the chat a message belongs to, if present."""
+    chat = message.get("chat")
+    return chat.get("id") if chat else None
+
+
+def _get_download_semaphore() -> asyncio.Semaphore:
+    """Return the download semaphore for the running event loop."""
+    global _download_semaphore, _download_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _download_semaphore is None or _download_semaphore_loop is not loop:
+        _download_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        _download_semaphore_loop = loop
+    return _download_semaphore
+
 
-@dataclass
+def _forget_failed(key: tuple, task: "asyncio.Task[Optional[ProcessedMessage]]") -> None:
+    """Drop a failed or cancelled task from _seen so a redelivery retries."""
+    if (task.cancelled() or task.exception() is not None) and _seen.get(key) is task:
+        del _seen[key]
+
+
+async def _gather_all(aws: Iterable[Awaitable[Any]]) -> list[Any]:
+    """Await all concurrently; the first failure cancels the rest.
+
+    Like asyncio.TaskGroup (3.11+): sibling downloads don't keep running
+    unobserved after one fails, and the first error propagates.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Let cancelled downloads remove their partial files before raising
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+@dataclass(slots=True)
 class MediaInfo:
     """Information about processed media."""
+
     file_id: str
     file_path: str
     workspace_path: str
-    file_type: str  # "photo", "document", etc.
+    file_type: str  # "photo", "document", "video", etc.
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedMessage:
     """A message after processing by the hook."""
+
     original_message: str
     media_info: Optional[MediaInfo] = None
     rewritten_message: Optional[str] = None
+    media_items: list[MediaInfo] = field(default_factory=list)
 
 
 class TelegramMediaHook:
@@ -43,7 +165,7 @@ class TelegramMediaHook:
             config: Configuration. Uses default if not provided.
         """
         self.config = config or get_config()
-        self.telegram_client = TelegramClient()
+        self.telegram_client = TelegramClient.shared()
         self.file_manager = FileManager()
 
     async def process_message(self, message_data: dict[str, Any]) -> ProcessedMessage:
@@ -55,116 +177,70 @@ class TelegramMediaHook:
         Returns:
             ProcessedMessage with media info and rewritten content.
         """
-        # Extract message text
+        media = find_media(message_data) or []
+        return await self._process_media(message_data, media)
+
+    async def _process_media(
+        self, message_data: dict[str, Any], media: list[tuple[str, dict[str, Any]]]
+    ) -> ProcessedMessage:
+        """Download the given media concurrently and rewrite the message."""
         original_text = message_data.get("text") or message_data.get("caption") or ""
         message_id = message_data.get("message_id", "unknown")
 
-        # Check for media
-        media_info = None
-
-        # Check for photo
-        if "photo" in message_data:
-            photos = message_data["photo"]
-            if photos:
-                # Get the largest photo
-                photo = photos[-1]
-                media_info = await self._process_photo(
-                    photo.get("file_id"),
-                    message_id
-                )
-
-        # Check for document
-        elif "document" in message_data:
-            doc = message_data["document"]
-            media_info = await self._process_document(
-                doc.get("file_id"),
-                doc.get("file_name"),
-                message_id
-            )
-
-        # Build rewritten message
-        rewritten = original_text
-        if media_info:
-            # Add media info to message
-            media_line = f"\n\n📎 用户上传了图片: {media_info.workspace_path}"
-            rewritten = original_text + media_line
+        downloads = [self._download_media(kind, file_obj, message_id) for kind, file_obj in media]
+        media_items = await _gather_all(downloads)
+        media_info = media_items[0] if media_items else None
+
+        # Build rewritten message, one line per media item
+        rewritten = "".join(
+            [original_text]
+            + [
+                f"\n\n📎 用户上传了{_MEDIA_LABELS.get(item.file_type, '媒体')}: {item.workspace_path}"
+                for item in media_items
+            ]
+        )
 
         return ProcessedMessage(
             original_message=original_text,
             media_info=media_info,
             rewritten_message=rewritten,
+            media_items=media_items,
         )
 
-    async def _process_photo(
-        self,
-        file_id: str,
-        message_id: str
-    ) -> MediaInfo:
-        """Process a photo from Telegram.
-
-        Args:
-            file_id: Telegram file_id.
-            message_id: Message ID for logging.
-
-        Returns:
-            MediaInfo about the saved file.
-        """
-        logger.info(f"Processing photo from message {message_id}")
-
-        # Download file
-        file_info, content = await self.telegram_client.get_file_info(file_id)
-
-        # Generate filename
-        filename = self.file_manager.generate_filename("photo.jpg")
-
-        # Save to disk
-        file_path = await self.file_manager.save_file(content, filename)
-        workspace_path = self.file_manager.get_workspace_relative_path(file_path)
-
-        logger.info(f"Saved photo to {file_path}")
-
-        return MediaInfo(
-            file_id=file_id,
-            file_path=str(file_path),
-            workspace_path=workspace_path,
-            file_type="photo",
-        )
-
-    async def _process_document(
-        self,
-        file_id: str,
-        original_filename: Optional[str],
-        message_id: str
+    async def _download_media(
+        self, kind: str, file_obj: dict[str, Any], message_id: str
     ) -> MediaInfo:
-        """Process a document from Telegram.
+        """Download one media file from Telegram into the workspace.
 
         Args:
-            file_id: Telegram file_id.
-            original_filename: Original filename from Telegram.
+            kind: Media field name ("photo", "document", "video", ...).
+            file_obj: Telegram file object for that field.
             message_id: Message ID for logging.
 
         Returns:
             MediaInfo about the saved file.
         """
-        logger.info(f"Processing document from message {message_id}")
-
-        # Download file
-        file_info, content = await self.telegram_client.get_file_info(file_id)
+        file_id = file_obj["file_id"]
+        logger.info("Processing %s from message %s", kind, message_id)
 
         # Generate filename (preserve extension)
-        filename = self.file_manager.generate_filename(original_filename or "document")
+        filename = self.file_manager.generate_filename(
+            file_obj.get("file_name") or _MEDIA_DEFAULT_NAMES[kind]
+        )
 
-        # Save to disk
-        file_path = await self.file_manager.save_file(content, filename)
+        # Stream download to disk
+        async with _get_download_semaphore():
+            file_info, chunks = await self.telegram_client.get_file_stream(file_id)
+            file_path = await self.file_manager.save_stream(chunks, filename)
         workspace_path = self.file_manager.get_workspace_relative_path(file_path)
 
-        logger.info(f"Saved document to {file_path}")
+        logger.info("Saved %s to %s", kind, file_path)
 
         return MediaInfo(
             file_id=file_id,
             file_path=str(file_path),
             workspace_path=workspace_path,
-            file_type="document",
+            file_type=kind,
         )
 
     async def handle_update(self, update: dict[str, Any]) -> Optional[ProcessedMessage]:
@@ -174,26 +250,69 @@ class TelegramMediaHook:
             update: The raw update from Telegram.
 
         Returns:
-            ProcessedMessage if media was found, None otherwise.
+            ProcessedMessage if media was found, None otherwise. A message
+            handled recently by any hook (Telegram or Gateway redelivery),
+            or still being handled, returns that result without
+            downloading again.
         """
-        # Extract message from update
-        message = update.get("message")
-        if not message:
-            # Also check for edited_message
-            message = update.get("edited_message")
+        # Extract message from update (also check for edited_message)
+        message: dict[str, Any] = update.get("message") or update.get("edited_message") or {}
 
-        if not message:
+        # Skip updates without media or with malformed media fields
+        media = find_media(message)
+        if not media:
             return None
 
-        # Check if there's media
-        has_photo = "photo" in message
-        has_document = "document" in message
+        # edit_date and file_ids included so an edit (new caption or new
+        # media) is processed again rather than answered from the cache
+        key = (
+            message_chat_id(message),
+            message.get("message_id"),
+            message.get("edit_date"),
+            *(file_obj["file_id"] for _, file_obj in media),
+        )
+        task = _seen.get(key)
+        # An unfinished task from an earlier event loop will never finish
+        if task is not None and (task.done() or task.get_loop() is asyncio.get_running_loop()):
+            _seen.move_to_end(key)
+        else:
+            task = asyncio.ensure_future(self._process_media(message, media))
+            task.add_done_callback(partial(_forget_failed, key))
+            _seen[key] = task
+            if len(_seen) > SEEN_LIMIT:
+                _seen.popitem(last=False)
+        # Other callers may be waiting on the same task; cancelling this
+        # one (client gone, sibling failed) must not cancel it for them
+        return await asyncio.shield(task)
+
+    async def handle_updates(
+        self, updates: list[dict[str, Any]]
+    ) -> list[Optional[ProcessedMessage] | Exception]:
+        """Handle a batch of Telegram updates concurrently.
+
+        Media groups arrive as one update per item, so this is how an
+        album gets downloaded in parallel. Concurrency is capped by the
+        shared download semaphore.
 
-        if not has_photo and not has_document:
-            return None
+        Args:
+            updates: Raw updates from Telegram.
 
-        # Process the message
-        return await self.process_message(message)
+        Returns:
+            One result per update, in the same order as the input. An
+            update that failed gets its exception instead, without
+            affecting the others.
+        """
+        results = await asyncio.gather(
+            *(self.handle_update(u) for u in updates), return_exceptions=True
+        )
+        handled: list[Optional[ProcessedMessage] | Exception] = []
+        for result in results:
+            if isinstance(result, Exception) or not isinstance(result, BaseException):
+                handled.append(result)
+            else:
+                # Cancellation and the like are not per-update failures
+                raise result
+        return handled
 
 
 # Standalone function for easy integration
@@ -214,7 +333,6 @@ async def process_telegram_update(update: dict[str, Any]) -> Optional[ProcessedM
 
 # For testing
 if __name__ == "__main__":
-    import asyncio
 
     async def test():
         """Test the hook with a sample update."""
@@ -230,11 +348,11 @@ if __name__ == "__main__":
                     {"file_id": "test", "file_unique_id": "test", "file_size": 1000},
                 ],
                 "text": "Test message",
-            }
+            },
         }
 
         hook = TelegramMediaHook()
         result = await hook.handle_update(test_update)
-        print(json.dumps(result, default=str, indent=2))
+        print(dumps(result, indent=True).decode())
 
     asyncio.run(test())
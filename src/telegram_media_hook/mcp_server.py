@@ -1,14 +1,353 @@
-"""MCP server for Telegram media hook."""
+"""MCP server for Telegram media hook.
 
+Exposes the media queue to OpenClaw as tools. File_ids reach the queue
+either from the Gateway (queue_api) or from polling Telegram here; the
+fetch tools download every pending item into the workspace upload dir.
+"""
+
+import asyncio
 import logging
+import threading
+from collections.abc import AsyncIterator, Container
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
 
 from mcp.server.fastmcp import FastMCP
 
 from telegram_media_hook.config import get_config
+from telegram_media_hook.file_manager import FileManager
+from telegram_media_hook.hook import find_media, message_chat_id
+from telegram_media_hook.queue_service import (
+    MAX_RETRIES,
+    enqueue,
+    enqueue_async,
+    ensure_queue_dir,
+    locked_queue,
+    mark_processed,
+    new_item,
+    read_queue,
+    write_atomic,
+)
+from telegram_media_hook.telegram_client import MAX_POLL_TIMEOUT, TelegramClient
 
 logger = logging.getLogger(__name__)
 
-mcp = FastMCP("telegram-media-hook")
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Prepare directories once at startup; close the Telegram pool on stop."""
+    await _file_manager().ensure_upload_dir()
+    ensure_queue_dir()
+    try:
+        yield
+    finally:
+        await TelegramClient.shared().aclose()
+
+
+mcp = FastMCP("telegram-media-hook", lifespan=_lifespan)
+
+# Upper bound on concurrent downloads per fetch, to stay clear of FLOOD_WAIT
+MAX_CONCURRENT_DOWNLOADS = 16
+
+# Overlapping fetch/poll calls would download the same pending items twice,
+# leaving the loser's file unrecorded; they take turns instead
+_fetch_lock = asyncio.Lock()
+
+# Overlapping fetch/poll calls write the offset from worker threads;
+# write_atomic() needs its writers serialized
+_offset_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _file_manager() -> FileManager:
+    """Return the FileManager shared by every tool call."""
+    return FileManager()
+
+
+def _offset_path() -> Path:
+    """Return the file storing the next getUpdates offset."""
+    return get_config().queue_path.with_name("telegram_offset")
+
+
+def _read_offset() -> int:
+    try:
+        return int(_offset_path().read_text().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_offset(offset: int) -> None:
+    ensure_queue_dir()
+    with _offset_lock:
+        # An overlapping poll may already have acknowledged further
+        if offset <= _read_offset():
+            return
+        # A torn write would reset the offset and replay old updates
+        write_atomic(_offset_path(), str(offset).encode())
+
+
+def _queue_items_from_updates(
+    updates: list[dict],
+    processed_ids: Container[str] = (),
+) -> list[dict]:
+    """Turn raw Telegram updates into pending queue items, one per media file.
+
+    Args:
+        updates: Raw Telegram updates.
+        processed_ids: file_ids already downloaded. An edited_message
+            (e.g. a changed caption) redelivers its media, which is only
+            queued if it is not among these.
+    """
+    # Most updates in a batch carry no media; drop them in one pass first
+    with_media = []
+    for update in updates:
+        edited = "message" not in update
+        message = update.get("edited_message" if edited else "message") or {}
+        media = find_media(message)
+        if media and edited:
+            media = [(kind, obj) for kind, obj in media if obj["file_id"] not in processed_ids]
+        if media:
+            with_media.append((message, media))
+    if not with_media:
+        return []
+
+    items = []
+    queued_at = datetime.now().isoformat()
+    for message, media in with_media:
+        message_id = message.get("message_id", 0)
+        chat_id = message_chat_id(message) or 0
+        caption = message.get("caption") or message.get("text") or ""
+        for kind, file_obj in media:
+            items.append(
+                new_item(
+                    file_obj["file_id"],
+                    message_id,
+                    chat_id,
+                    caption,
+                    queued_at=queued_at,
+                    file_type=kind,
+                    file_name=file_obj.get("file_name", ""),
+                )
+            )
+    return items
+
+
+async def _poll_updates(client: TelegramClient, timeout: int) -> int:
+    """Long-poll Telegram until media is queued or `timeout` seconds pass.
+
+    Telegram answers as soon as any update arrives, so updates without
+    media (plain text, stickers) are acknowledged and the wait resumes
+    for the remaining time. timeout=0 makes exactly one short poll.
+
+    Returns:
+        Number of newly queued items.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    offset = _read_offset()
+    while True:
+        remaining = max(0, round(deadline - loop.time()))
+        updates = await client.get_updates(offset=offset, timeout=remaining)
+        if updates:
+            added = 0
+            processed_ids: set[str] = set()
+            if any("edited_message" in update for update in updates):
+                queue = await asyncio.to_thread(read_queue)
+                processed_ids = {item["file_id"] for item in queue.get("processed", [])}
+            items = _queue_items_from_updates(updates, processed_ids)
+            if items:
+                added = sum(await asyncio.to_thread(enqueue, items))
+
+            # Acknowledge only after the items are safely in the queue
+            offset = updates[-1]["update_id"] + 1
+            await asyncio.to_thread(_write_offset, offset)
+            if added:
+                return added
+        if remaining == 0 or loop.time() >= deadline:
+            return 0
+
+
+async def _download_one(
+    item: dict,
+    client: TelegramClient,
+    file_manager: FileManager,
+    semaphore: asyncio.Semaphore,
+) -> dict:
+    """Download one queued item and return its fetched-media entry."""
+    async with semaphore:
+        file_info, chunks = await client.get_file_stream(item["file_id"])
+        # Telegram's file_path carries the real extension ("photos/file_1.jpg")
+        filename = file_manager.generate_filename(item.get("file_name") or file_info.file_path)
+        file_path = await file_manager.save_stream(chunks, filename)
+
+    return {
+        "id": item["file_id"],
+        "path": str(file_path),
+        "workspace_path": file_manager.get_workspace_relative_path(file_path),
+        "type": item.get("file_type", "photo"),
+        "caption": item.get("caption", ""),
+    }
+
+
+def _record_results(fetched_by_id: dict[str, dict], errors: dict[str, str]) -> list[dict]:
+    """Move downloaded items to processed and count retries for failed ones.
+
+    Blocking (lock + fsynced write); run it in a worker thread.
+
+    Returns:
+        Items that ran out of retries, as {"id", "error"} entries.
+    """
+    failed = []
+    with locked_queue() as queue:
+        # Taken under the lock so history stays in finish order for
+        # _expire_history's binary search
+        now = datetime.now()
+        now_iso = now.isoformat()
+        now_ts = now.timestamp()
+        processed = queue.setdefault("processed", [])
+        exhausted = queue.setdefault("failed", [])
+        still_pending = []
+        # Items were just loaded under the lock, so update them in place
+        for item in queue.get("pending", []):
+            file_id = item.get("file_id")
+            entry = fetched_by_id.get(file_id)
+            if entry is not None:
+                item["downloaded_at"] = now_iso
+                item["path"] = entry["path"]
+                item["workspace_path"] = entry["workspace_path"]
+                item["finished_ts"] = now_ts
+                processed.append(item)
+            elif file_id in errors:
+                item["error"] = errors[file_id]
+                item["retry_count"] = item.get("retry_count", 0) + 1
+                if item["retry_count"] >= MAX_RETRIES:
+                    item["finished_ts"] = now_ts
+                    exhausted.append(item)
+                    failed.append({"id": file_id, "error": errors[file_id]})
+                else:
+                    still_pending.append(item)
+            else:
+                # Queued while we were downloading
+                still_pending.append(item)
+        queue["pending"] = still_pending
+    return failed
+
+
+async def _fetch(timeout: int) -> dict[str, Any]:
+    """Poll Telegram, then download every pending item concurrently.
+
+    Calls are serialized: one waits for the previous to record its
+    downloads, then finds only what is still pending.
+    """
+    async with _fetch_lock:
+        return await _fetch_locked(timeout)
+
+
+async def _fetch_locked(timeout: int) -> dict[str, Any]:
+    client = TelegramClient.shared()
+    file_manager = _file_manager()
+
+    try:
+        await _poll_updates(client, timeout)
+    except Exception as e:
+        # Items queued by the Gateway can still be downloaded
+        logger.warning("Polling Telegram failed: %s", e)
+
+    to_process = (await asyncio.to_thread(read_queue)).get("pending", [])
+    if not to_process:
+        return {"count": 0, "message": "No new media", "fetched": []}
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    results = await asyncio.gather(
+        *(_download_one(item, client, file_manager, semaphore) for item in to_process),
+        return_exceptions=True,
+    )
+
+    fetched = []
+    errors = {}
+    for item, result in zip(to_process, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.warning("Download failed for %s: %s", item["file_id"], result)
+            errors[item["file_id"]] = str(result)
+        else:
+            fetched.append(result)
+    fetched_by_id = {entry["id"]: entry for entry in fetched}
+    failed = await asyncio.to_thread(_record_results, fetched_by_id, errors)
+
+    response = {
+        "count": len(fetched),
+        "message": f"Downloaded {len(fetched)} media file(s)",
+        "fetched": fetched,
+    }
+    if failed:
+        response["failed"] = failed
+    return response
+
+
+@mcp.tool()
+async def fetch_telegram_media() -> dict[str, Any]:
+    """Poll Telegram once, download any new media, and return the file paths."""
+    return await _fetch(timeout=0)
+
+
+@mcp.tool()
+async def poll_telegram(timeout: int = 25) -> dict[str, Any]:
+    """Wait up to `timeout` seconds (max 50) for new media, then download it.
+
+    Returns as soon as media arrives. Use this right after the user says
+    they are about to upload something.
+    """
+    return await _fetch(timeout=min(max(timeout, 0), MAX_POLL_TIMEOUT))
+
+
+@mcp.tool()
+async def list_pending_media() -> dict[str, Any]:
+    """List fetched media not yet marked as processed."""
+    queue = await asyncio.to_thread(read_queue)
+    media = [
+        {
+            "id": item["file_id"],
+            "path": item.get("path", ""),
+            "workspace_path": item.get("workspace_path", ""),
+            "type": item.get("file_type", "photo"),
+            "caption": item.get("caption", ""),
+            "downloaded_at": item.get("downloaded_at", ""),
+        }
+        for item in queue.get("processed", [])
+        if not item.get("marked_at")
+    ]
+    return {
+        "count": len(media),
+        "media": media,
+        "queued": len(queue.get("pending", [])),
+        "failed": len(queue.get("failed", [])),
+    }
+
+
+@mcp.tool()
+async def mark_media_processed(media_id: str) -> dict[str, Any]:
+    """Mark a fetched media item as done so it no longer shows as pending."""
+    marked_at = datetime.now().isoformat()
+    if await asyncio.to_thread(mark_processed, media_id, marked_at):
+        return {"ok": True, "id": media_id}
+    return {"ok": False, "error": f"Unknown media id: {media_id}"}
+
+
+async def add_to_queue(
+    file_id: str,
+    message_id: int = 0,
+    chat_id: int = 0,
+    caption: str = "",
+) -> dict[str, Any]:
+    """Add a file_id to the pending queue (same as the queue API's /add)."""
+    added = await enqueue_async(new_item(file_id, message_id, chat_id, caption))
+
+    if not added:
+        return {"ok": True, "message": "Already in queue"}
+    return {"ok": True, "file_id": file_id}
 
 
 def main() -> None:
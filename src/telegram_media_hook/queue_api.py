@@ -3,53 +3,85 @@
 Gateway calls this API to add file_ids to the queue when it receives media.
 """
 
-from datetime import datetime
+import asyncio
+from typing import Optional
 
 from aiohttp import web
 
-from telegram_media_hook.queue_service import locked_queue, read_queue
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - depends on installed extras
+    uvloop = None
+
+from telegram_media_hook.queue_service import enqueue_async, new_item, read_queue
+from telegram_media_hook.serialization import dumps, loads
+
+# (queue dict from read_queue(), /status body encoded from it)
+_status_cache: Optional[tuple[dict, bytes]] = None
+
+
+def _json_response(data: dict, status: int = 200) -> web.Response:
+    """Like web.json_response, but encoded once straight to bytes."""
+    return web.Response(body=dumps(data), status=status, content_type="application/json")
 
 
 async def handle_add(request: web.Request) -> web.Response:
     """Add a file_id to the pending queue."""
     try:
-        data = await request.json()
+        data = await request.json(loads=loads)
     except Exception:
-        return web.json_response({"error": "Invalid JSON"}, status=400)
+        return _json_response({"error": "Invalid JSON"}, status=400)
 
-    file_id = data.get("file_id")
+    file_id = data.get("file_id") if isinstance(data, dict) else None
     if not file_id:
-        return web.json_response({"error": "file_id required"}, status=400)
-
-    with locked_queue() as queue:
-        for item in queue.get("pending", []):
-            if item.get("file_id") == file_id:
-                return web.json_response({"ok": True, "message": "Already in queue"})
-        queue.setdefault("pending", []).append({
-            "file_id": file_id,
-            "message_id": data.get("message_id", 0),
-            "chat_id": data.get("chat_id", 0),
-            "caption": data.get("caption", ""),
-            "queued_at": datetime.now().isoformat(),
-            "retry_count": 0,
-        })
-
-    return web.json_response({"ok": True, "file_id": file_id})
+        return _json_response({"error": "file_id required"}, status=400)
+    # Numeric ids have always been accepted; they are stored as strings
+    if isinstance(file_id, int) and not isinstance(file_id, bool):
+        file_id = str(file_id)
+    if not isinstance(file_id, str):
+        return _json_response({"error": "file_id must be a string"}, status=400)
+
+    added = await enqueue_async(
+        new_item(
+            file_id,
+            data.get("message_id", 0),
+            data.get("chat_id", 0),
+            data.get("caption", ""),
+        )
+    )
+
+    if not added:
+        return _json_response({"ok": True, "message": "Already in queue"})
+    return _json_response({"ok": True, "file_id": file_id})
 
 
 async def handle_status(request: web.Request) -> web.Response:
-    """Return a summary of the current queue state."""
-    queue = read_queue()
-    return web.json_response({
-        "pending": queue.get("pending", []),
-        "processed_count": len(queue.get("processed", [])),
-        "failed": queue.get("failed", []),
-    })
+    """Return a summary of the current queue state.
+
+    read_queue() hands back the same dict while the queue files are
+    unchanged, so the encoded body is reused until they change.
+    """
+    global _status_cache
+    queue = await asyncio.to_thread(read_queue)
+    if _status_cache is None or _status_cache[0] is not queue:
+        _status_cache = (
+            queue,
+            dumps(
+                {
+                    "pending": queue.get("pending", []),
+                    # Lifetime total, including items moved to the archive
+                    "processed_count": len(queue.get("processed", []))
+                    + queue.get("archived_processed", 0),
+                    "failed": queue.get("failed", []),
+                }
+            ),
+        )
+    return web.Response(body=_status_cache[1], content_type="application/json")
 
 
 async def handle_health(request: web.Request) -> web.Response:
     """Health check."""
-    return web.json_response({"status": "ok"})
+    return _json_response({"status": "ok"})
 
 
 def create_app() -> web.Application:
@@ -61,9 +93,10 @@ def create_app() -> web.Application:
 
 
 def run_server(port: int = 8081) -> None:
-    """Run the queue API server."""
+    """Run the queue API server, on uvloop when it is installed."""
     app = create_app()
-    web.run_app(app, host="127.0.0.1", port=port)
+    loop = uvloop.new_event_loop() if uvloop is not None else None
+    web.run_app(app, host="127.0.0.1", port=port, loop=loop)
 
 
 if __name__ == "__main__":
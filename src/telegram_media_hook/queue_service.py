@@ -4,56 +4,476 @@ Provides atomic read/write helpers with file locking so that
 the Gateway (queue_api) and MCP server processes can safely share
 the same JSON file without data races.
 
-Queue format (telegram_media_queue.json):
+Queue format, as yielded by locked_queue() and returned by read_queue():
 {
   "pending":   [{"file_id": "...", "message_id": 0, "chat_id": 0,
-                 "caption": "...", "queued_at": "...", "retry_count": 0}],
+                 "caption": "...", "queued_at": "...", "retry_count": 0,
+                 "file_type": "photo", "file_name": ""}],
   "processed": [{"file_id": "...", ..., "downloaded_at": "...",
-                 "workspace_path": "..."}],
-  "failed":    [{"file_id": "...", ..., "error": "...", "retry_count": 3}]
+                 "path": "...", "workspace_path": "...",
+                 "finished_ts": 0.0, "marked_at": "..."}],
+  "failed":    [{"file_id": "...", ..., "error": "...", "retry_count": 3,
+                 "finished_ts": 0.0}],
+  "archived_processed": 0
 }
+
+On disk the hot and cold parts live in separate files: "pending" in
+telegram_media_queue.json, "processed" and "failed" in
+telegram_media_queue.history.json. enqueue() only reads the pending file,
+so adding an item costs the same however much history has built up.
+Files written before the split keep all three lists in the queue file;
+they are read as-is and split on the next rewrite.
+
+``file_type`` and ``file_name`` are only known for items queued from a
+Telegram update; ``marked_at`` is set once a skill marks the media done.
+``finished_ts`` is the epoch time an item entered processed / failed, so
+age checks compare floats instead of parsing ISO strings; items written
+before it existed fall back to parsing ``downloaded_at`` / ``queued_at``.
+
+The two JSON files form a snapshot. Frequent small mutations (enqueue, mark) are
+appended as one JSON line each to a write-ahead log next to it
+(telegram_media_queue.log) instead of rewriting the whole snapshot:
+
+    {"op": "add", "item": {...}, "gen": 4}
+    {"op": "mark", "file_id": "...", "at": "...", "gen": 4}
+
+Readers replay the log on top of the snapshot. Any full rewrite through
+locked_queue() — or a log reaching COMPACT_AFTER records — writes a new
+snapshot and removes the log. Each snapshot stores a "generation" that
+is bumped on every rewrite; log records carry the generation they were
+written against, so a log left behind by a crash between the two steps
+is ignored rather than replayed twice.
+
+The history file keeps at most HISTORY_LIMIT processed and failed items. Older
+ones are moved to an append-only archive (telegram_media_queue.archive),
+one {"list": "processed" | "failed", "item": {...}} line each, so the
+snapshot's size tracks recent activity rather than lifetime history.
+Processed items not yet marked are never archived. "archived_processed"
+counts the processed items moved there, so len(processed) plus it is the
+lifetime total.
+
+Log appends are fsynced. enqueue_async() groups single-item adds that
+arrive within GROUP_COMMIT_WINDOW into one append, so concurrent callers
+share a single disk flush.
 """
 
-import json
+import asyncio
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Generator, Iterator
 from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Generator
+from typing import Any, Optional
 
 from filelock import FileLock
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
 from telegram_media_hook.config import get_config
+from telegram_media_hook.serialization import JSONDecodeError, dumps, loads
 
 MAX_RETRIES = 3
 
+# Log records to accumulate before folding them into the snapshot
+COMPACT_AFTER = 1000
+
+# Processed / failed items kept in the snapshot; older ones are archived
+HISTORY_LIMIT = 1000
+
+# Seconds to collect concurrent enqueue_async() calls into one fsync
+GROUP_COMMIT_WINDOW = 0.005
+
+# fdatasync skips flushing metadata (e.g. mtime) that a reader never needs;
+# macOS and Windows only have fsync
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+# flock() excludes other processes; threads sharing our fd need this too
+_thread_lock = threading.Lock()
+# Lock-file descriptors kept open for the life of the process
+_lock_fds: dict[Path, int] = {}
+
+# Queue directories already created by this process
+_dirs_ready: set[Path] = set()
+
+_batch: list[tuple[dict, asyncio.Future[bool]]] = []
+_flush_task: asyncio.Task | None = None
+
+# (file state key, parsed queue) from the last read_queue() parse or snapshot write
+_read_cache: Optional[tuple[tuple, dict]] = None
+
+# Last queued_at timestamp, reused while the wall-clock second is unchanged
+_iso_second = -1
+_iso = ""
+
 
 def get_queue_path() -> Path:
     """Return the path to the queue JSON file."""
     return get_config().queue_path
 
 
+@lru_cache(maxsize=4)
+def _sidecar_paths(queue_path: Path) -> tuple[Path, Path, Path, Path]:
+    """Return (lock, log, archive, history) paths for a queue file.
+
+    Keyed on the queue path, so a config change picks up new paths.
+    """
+    return (
+        queue_path.with_suffix(".lock"),
+        queue_path.with_suffix(".log"),
+        queue_path.with_suffix(".archive"),
+        queue_path.with_suffix(".history.json"),
+    )
+
+
+def ensure_queue_dir() -> Path:
+    """Create the queue directory if needed and return it.
+
+    Only the first call per directory touches the filesystem.
+    """
+    queue_dir = get_queue_path().parent
+    if queue_dir not in _dirs_ready:
+        queue_dir.mkdir(parents=True, exist_ok=True)
+        _dirs_ready.add(queue_dir)
+    return queue_dir
+
+
 def _lock_path() -> Path:
-    return get_queue_path().with_suffix(".lock")
+    """Return the lock path, creating the queue directory on first use.
+
+    Every queue operation takes the lock first, so the directory exists
+    for the reads and writes that follow.
+    """
+    ensure_queue_dir()
+    return _sidecar_paths(get_queue_path())[0]
 
 
-def _read_raw() -> dict:
-    queue_path = get_queue_path()
-    queue_path.parent.mkdir(parents=True, exist_ok=True)
-    if not queue_path.exists():
-        return {"pending": [], "processed": [], "failed": []}
+@contextmanager
+def _queue_lock() -> Iterator[None]:
+    """Hold the queue lock against other processes and threads.
+
+    On POSIX this is one flock() on a lock-file descriptor opened once
+    per process, instead of FileLock's open/lock/close per acquire. The
+    queue file itself can't carry the lock because write_atomic()
+    replaces it with a new inode.
+
+    If the lock file was deleted or replaced since it was opened, other
+    processes lock the file now at the path, so the cached descriptor is
+    dropped and the new file opened instead.
+    """
+    path = _lock_path()
+    if fcntl is None:
+        with FileLock(str(path)):
+            yield
+        return
+
+    with _thread_lock:
+        while True:
+            fd = _lock_fds.get(path)
+            if fd is None:
+                fd = _lock_fds[path] = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(fd).st_ino:
+                break
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            del _lock_fds[path]
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _log_path() -> Path:
+    return _sidecar_paths(get_queue_path())[1]
+
+
+def _intern_item(item: dict) -> dict:
+    """Share one str object per file_id / file_type value across items.
+
+    The same file_id shows up in several lists and in every log record
+    that touches it; interning also makes the equality checks in the
+    dedupe and mark scans pointer comparisons.
+    """
+    # Only str can be interned; older queue files may hold other types
+    for key in ("file_id", "file_type"):
+        value = item.get(key)
+        if type(value) is str:
+            item[key] = sys.intern(value)
+    return item
+
+
+def _read_json(path: Path) -> Optional[dict]:
     try:
-        with open(queue_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        data.setdefault("failed", [])
-        return data
-    except (json.JSONDecodeError, IOError):
-        return {"pending": [], "processed": [], "failed": []}
+        with open(path, "rb") as f:
+            data = loads(f.read())
+    except (JSONDecodeError, IOError):
+        # Missing (first run) or unreadable
+        return None
+    return data if isinstance(data, dict) else None
 
 
-def _write_raw(queue: dict) -> None:
-    queue_path = get_queue_path()
-    queue_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(queue_path, "w", encoding="utf-8") as f:
-        json.dump(queue, f, ensure_ascii=False, indent=2)
+def _read_raw(history: bool = True) -> tuple[dict, int]:
+    """Read the snapshot. Returns (queue, generation).
+
+    With history=False only the pending file is read and the queue has
+    no "processed" / "failed" keys; it must not be written back.
+    """
+    data = _read_json(get_queue_path()) or {}
+    queue = {"pending": data.get("pending", [])}
+    if history:
+        # Queue files written before the split carry the history themselves
+        cold = _read_json(_sidecar_paths(get_queue_path())[3]) or data
+        queue["processed"] = cold.get("processed", [])
+        queue["failed"] = cold.get("failed", [])
+    for key in ("pending", "processed", "failed"):
+        for item in queue.get(key, ()):
+            _intern_item(item)
+    if history:
+        queue["archived_processed"] = cold.get("archived_processed", 0)
+    return queue, data.get("generation", 0)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace a file's content so readers see the old or new data, never a mix.
+
+    The data goes to a temp file that is fdatasynced and renamed over path;
+    the directory is then fsynced so the rename itself survives power loss.
+    Callers must serialize writers to the same path (e.g. via the queue lock).
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+        _datasync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+    if os.name == "posix":
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _trim_history(queue: dict) -> list[dict]:
+    """Cut processed / failed down to HISTORY_LIMIT, oldest first.
+
+    Returns:
+        Archive records for the removed items.
+    """
+    archived: list[dict] = []
+    failed = queue.get("failed", [])
+    if len(failed) > HISTORY_LIMIT:
+        archived.extend({"list": "failed", "item": item} for item in failed[:-HISTORY_LIMIT])
+        del failed[:-HISTORY_LIMIT]
+
+    processed = queue.get("processed", [])
+    excess = len(processed) - HISTORY_LIMIT
+    if excess > 0:
+        kept = []
+        for item in processed:
+            # Unmarked items are still listed by list_pending_media
+            if excess and item.get("marked_at"):
+                archived.append({"list": "processed", "item": item})
+                excess -= 1
+            else:
+                kept.append(item)
+        queue["processed"] = kept
+    return archived
+
+
+def _finished_ts(item: dict) -> float:
+    """Epoch time an item entered processed / failed (0.0 if unknown)."""
+    ts = item.get("finished_ts")
+    if ts is None:
+        stamp = item.get("downloaded_at") or item.get("queued_at")
+        try:
+            ts = datetime.fromisoformat(stamp).timestamp() if stamp else 0.0
+        except ValueError:
+            ts = 0.0
+    return ts
+
+
+def _expire_history(queue: dict, cutoff: float) -> list[dict]:
+    """Remove processed / failed items finished before cutoff (epoch).
+
+    Both lists are appended in finish order under the queue lock, so when
+    every item carries finished_ts the expired items form a prefix found
+    by binary search, and only that prefix is walked. Items written before
+    finished_ts existed fall back to timestamps that aren't in finish
+    order (queued_at), so lists holding any are scanned in full.
+
+    Returns:
+        Archive records for the removed items.
+    """
+    archived = []
+    for key in ("processed", "failed"):
+        items = queue.get(key, [])
+        if all("finished_ts" in item for item in items):
+            cut = bisect_left(items, cutoff, key=_finished_ts)
+        else:
+            cut = len(items)
+        if not cut:
+            continue
+        kept = []
+        for item in items[:cut]:
+            # Unmarked items are still listed by list_pending_media
+            if _finished_ts(item) >= cutoff or (key == "processed" and not item.get("marked_at")):
+                kept.append(item)
+            else:
+                archived.append({"list": key, "item": item})
+        kept.extend(items[cut:])
+        queue[key] = kept
+    return archived
+
+
+def _write_raw(queue: dict, generation: int, archived: Optional[list[dict]] = None) -> None:
+    """Write queue as the new snapshot. The caller must hold the queue lock."""
+    global _read_cache
+    archived = (archived or []) + _trim_history(queue)
+    queue["archived_processed"] = queue.get("archived_processed", 0) + sum(
+        record["list"] == "processed" for record in archived
+    )
+    if archived:
+        # Archive first: a crash before the snapshot lands may duplicate
+        # archive lines, but never loses an item
+        with open(_sidecar_paths(get_queue_path())[2], "ab") as f:
+            f.write(b"".join(dumps(record) + b"\n" for record in archived))
+            f.flush()
+            _datasync(f.fileno())
+    # History first: a crash before the pending file lands can leave an
+    # item in both lists (downloaded again), but never in neither
+    write_atomic(
+        _sidecar_paths(get_queue_path())[3],
+        dumps(
+            {
+                "processed": queue.get("processed", []),
+                "failed": queue.get("failed", []),
+                "archived_processed": queue["archived_processed"],
+            }
+        ),
+    )
+    # Compact on disk; `telegram-media-hook queue-status` pretty-prints it
+    write_atomic(
+        get_queue_path(),
+        dumps(
+            {
+                "pending": queue.get("pending", []),
+                "generation": generation,
+            }
+        ),
+    )
+    # The snapshot now includes every logged mutation
+    _log_path().unlink(missing_ok=True)
+    # We know what is on disk, so the next read_queue() needn't parse it.
+    # Lists are copied in case the caller keeps appending to its own.
+    _read_cache = (
+        _state_key(),
+        {key: list(value) if isinstance(value, list) else value for key, value in queue.items()},
+    )
+
+
+@dataclass(slots=True)
+class _Index:
+    """file_id lookups over one in-memory queue, built once per operation."""
+
+    pending_ids: set[str]
+    processed: dict[str, dict]
+
+    @classmethod
+    def build(cls, queue: dict) -> "_Index":
+        processed = {}
+        # Reversed so the oldest entry wins, matching a front-to-back scan
+        for item in reversed(queue.get("processed", [])):
+            processed[item["file_id"]] = item
+        return cls({item["file_id"] for item in queue.get("pending", [])}, processed)
+
+
+def _apply(queue: dict, record: dict, index: _Index) -> bool:
+    """Apply one log record to the queue. Returns True if it changed anything."""
+    op = record.get("op")
+    if op == "add":
+        item = _intern_item(record["item"])
+        if item["file_id"] in index.pending_ids:
+            return False
+        index.pending_ids.add(item["file_id"])
+        queue.setdefault("pending", []).append(item)
+        return True
+    if op == "mark":
+        processed = index.processed.get(record["file_id"])
+        if processed is not None:
+            processed["marked_at"] = record["at"]
+            return True
+    return False
+
+
+def _replay_log(queue: dict, generation: int, index: _Index) -> int:
+    """Replay the write-ahead log onto a snapshot of the given generation.
+
+    Returns:
+        Number of records replayed.
+    """
+    try:
+        with open(_log_path(), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return 0
+
+    count = 0
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except JSONDecodeError:
+            # Torn final line from a crash mid-append
+            continue
+        if record.get("gen") != generation:
+            # Already folded into this snapshot before a crash
+            continue
+        _apply(queue, record, index)
+        count += 1
+    return count
+
+
+def _read_state(history: bool = True) -> tuple[dict, int, int, _Index]:
+    """Return the current queue (snapshot + log), its generation, log length and index.
+
+    With history=False, see _read_raw(); mark records in the log are
+    counted but have nothing to apply to.
+    """
+    queue, generation = _read_raw(history)
+    index = _Index.build(queue)
+    return queue, generation, _replay_log(queue, generation, index), index
+
+
+def _commit(queue: dict, generation: int, log_count: int, records: list[dict]) -> None:
+    """Persist records already applied to queue, appending or compacting."""
+    if log_count + len(records) >= COMPACT_AFTER:
+        _write_raw(queue, generation + 1)
+        return
+    for record in records:
+        record["gen"] = generation
+    with open(_log_path(), "ab") as f:
+        f.write(b"".join(dumps(record) + b"\n" for record in records))
+        f.flush()
+        _datasync(f.fileno())
 
 
 @contextmanager
@@ -61,17 +481,61 @@ def locked_queue() -> Generator[dict, None, None]:
     """Acquire a file lock, yield the mutable queue dict, then write it back.
 
     Use this for any read-modify-write operation to prevent data races
-    between the Gateway (queue_api) and MCP server processes.
+    between the Gateway (queue_api) and MCP server processes. Writing back
+    replaces the snapshot and compacts the log; it is skipped when the
+    queue is unchanged and there is no log to fold in.
 
     Example::
 
         with locked_queue() as queue:
             queue["pending"].append(item)
     """
-    with FileLock(str(_lock_path())):
-        queue = _read_raw()
+    with _queue_lock():
+        queue, generation, log_count, _ = _read_state()
+        # Encoding is far cheaper than a rewrite, so compare to detect no-ops
+        before = dumps(queue)
         yield queue
-        _write_raw(queue)
+        if log_count or dumps(queue) != before:
+            _write_raw(queue, generation + 1)
+
+
+def compact(max_age_days: Optional[float] = None) -> tuple[int, int]:
+    """Fold the write-ahead log into a fresh snapshot and trim history.
+
+    Args:
+        max_age_days: Also archive processed / failed items that finished
+            more than this many days ago. Unmarked items are kept.
+
+    Returns:
+        (log records folded in, history items archived for age)
+    """
+    with _queue_lock():
+        queue, generation, log_count, _ = _read_state()
+        expired = []
+        if max_age_days is not None:
+            expired = _expire_history(queue, time.time() - max_age_days * 86400)
+        _write_raw(queue, generation + 1, expired)
+    return log_count, len(expired)
+
+
+def _state_key() -> tuple:
+    """Identify the on-disk queue state by the stat of the snapshot files and log.
+
+    The inode changes on every atomic snapshot replace and the log only
+    ever grows until it is removed, so an unchanged key means unchanged
+    content.
+    """
+    queue_path = get_queue_path()
+    key: list[object] = [queue_path]
+    _, log_path, _, history_path = _sidecar_paths(queue_path)
+    for path in (queue_path, history_path, log_path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            key.append(None)
+        else:
+            key.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(key)
 
 
 def read_queue() -> dict:
@@ -79,6 +543,164 @@ def read_queue() -> dict:
 
     Suitable for read-only inspection. The lock is released before returning
     so callers must not assume the data stays current.
+
+    While the files are unchanged the previously parsed queue is returned
+    without taking the lock, so the result is shared: do not mutate it.
+    """
+    global _read_cache
+    if _read_cache is not None and _read_cache[0] == _state_key():
+        return _read_cache[1]
+    with _queue_lock():
+        key = _state_key()
+        queue = _read_state()[0]
+    _read_cache = (key, queue)
+    return queue
+
+
+def _now_iso() -> str:
+    """Return the current local time in ISO format, formatted once per second."""
+    global _iso_second, _iso
+    now = int(time.time())
+    if now != _iso_second:
+        _iso = datetime.fromtimestamp(now).isoformat()
+        _iso_second = now
+    return _iso
+
+
+def new_item(
+    file_id: str,
+    message_id: int = 0,
+    chat_id: int = 0,
+    caption: str = "",
+    *,
+    queued_at: Optional[str] = None,
+    **fields: Any,
+) -> dict:
+    """Build a pending queue item in the format documented above.
+
+    Args:
+        file_id: Telegram file_id; stored as str.
+        queued_at: ISO timestamp; defaults to now, to the second. Pass one to share it
+            across a batch.
+        **fields: Extra fields known for the item, e.g. file_type and
+            file_name for items queued from a Telegram update.
+    """
+    return {
+        "file_id": str(file_id),
+        "message_id": message_id,
+        "chat_id": chat_id,
+        "caption": caption,
+        "queued_at": queued_at or _now_iso(),
+        "retry_count": 0,
+        **fields,
+    }
+
+
+def enqueue(items: list[dict]) -> list[bool]:
+    """Add items to the pending queue by appending them to the log.
+
+    Only the pending file is read, unless this append is due to compact
+    the log (which rewrites the history file too).
+
+    Returns:
+        One flag per item: True if added, False if its file_id was
+        already pending.
+    """
+    with _queue_lock():
+        queue, generation, log_count, index = _read_state(history=False)
+        if log_count + len(items) >= COMPACT_AFTER:
+            queue, generation, log_count, index = _read_state()
+        records = [{"op": "add", "item": item} for item in items]
+        added = [_apply(queue, record, index) for record in records]
+        records = [record for record, ok in zip(records, added, strict=True) if ok]
+        if records:
+            _commit(queue, generation, log_count, records)
+    return added
+
+
+async def enqueue_async(item: dict) -> bool:
+    """Add one item to the pending queue, sharing the write with concurrent callers.
+
+    Calls made within GROUP_COMMIT_WINDOW of each other are persisted by a
+    single enqueue() in a worker thread: one lock, one append, one fsync.
+    If that write fails, the items are retried one by one, so an item that
+    can't be queued only fails its own call.
+
+    Returns:
+        True if added, False if its file_id was already pending.
+    """
+    global _flush_task
+    future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+    _batch.append((item, future))
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_batch())
+        _flush_task.add_done_callback(_flush_done)
+    return await future
+
+
+def _take_batch() -> list[tuple[dict, asyncio.Future[bool]]]:
+    global _flush_task
+    batch = _batch[:]
+    _batch.clear()
+    _flush_task = None
+    return batch
+
+
+def _flush_done(task: asyncio.Task) -> None:
+    if task.cancelled() and _flush_task is task:
+        # Cancelled before it took the batch, possibly before it ever ran
+        for _, future in _take_batch():
+            future.cancel()
+
+
+def _enqueue_each(items: list[dict]) -> list[bool | Exception]:
+    """Enqueue items one at a time, returning each one's result or error."""
+    results: list[bool | Exception] = []
+    for item in items:
+        try:
+            results.extend(enqueue([item]))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def _flush_batch() -> None:
+    # A waiter may have been cancelled (client gone), so futures are only
+    # resolved if still pending; the rest of the batch must not hang
+    batch: list[tuple[dict, asyncio.Future[bool]]] = []
+    try:
+        await asyncio.sleep(GROUP_COMMIT_WINDOW)
+        batch = _take_batch()
+        items = [item for item, _ in batch]
+        results: list[bool | Exception]
+        try:
+            results = list(await asyncio.to_thread(enqueue, items))
+        except Exception:
+            results = await asyncio.to_thread(_enqueue_each, items)
+    except asyncio.CancelledError:
+        # Cancelled before taking the batch is handled by _flush_done()
+        for _, future in batch:
+            future.cancel()
+        raise
+    for (_, future), result in zip(batch, results, strict=True):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+def mark_processed(file_id: str, marked_at: str) -> bool:
+    """Set marked_at on a processed item by appending to the log.
+
+    Returns:
+        True if the item was found.
     """
-    with FileLock(str(_lock_path())):
-        return _read_raw()
+    record = {"op": "mark", "file_id": file_id, "at": marked_at}
+    with _queue_lock():
+        queue, generation, log_count, index = _read_state()
+        found = _apply(queue, record, index)
+        if found:
+            _commit(queue, generation, log_count, [record])
+    return found
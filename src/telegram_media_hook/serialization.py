@@ -0,0 +1,60 @@
+"""JSON encode/decode helpers.
+
+Uses orjson when it is installed (``pip install telegram-media-hook[fast]``)
+and falls back to the standard library otherwise. Both paths produce
+UTF-8 bytes and accept bytes or str input.
+"""
+
+import json
+from dataclasses import fields, is_dataclass
+from functools import cache
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on installed extras
+    orjson = None  # type: ignore[assignment]
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+@cache
+def _field_names(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in fields(cls))
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types JSON does not handle natively."""
+    if is_dataclass(obj) and not isinstance(obj, type):
+        # Shallow on purpose: the encoder calls back here for nested
+        # dataclasses, so asdict()'s recursive deepcopy is wasted work
+        return {name: getattr(obj, name) for name in _field_names(type(obj))}
+    return str(obj)
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, *, indent: bool = False) -> bytes:
+    """Encode an object as UTF-8 JSON bytes.
+
+    Dataclasses are serialized as dicts; anything else unknown uses str().
+
+    Args:
+        obj: Object to encode.
+        indent: Pretty-print with two-space indentation.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj,
+        default=_default,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+    ).encode("utf-8")
@@ -1,24 +1,66 @@
 """Telegram Bot API client."""
 
 import asyncio
+from collections.abc import AsyncGenerator
 from dataclasses import dataclass
-from pathlib import Path
+from importlib.util import find_spec
 from typing import Optional
+
 import httpx
+
 from telegram_media_hook.config import get_config
+from telegram_media_hook.serialization import JSONDecodeError, loads
+
+# Read size for streamed downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Longest getUpdates wait Telegram honours, in seconds
+MAX_POLL_TIMEOUT = 50
+
+# Update types we consume, JSON-encoded as getUpdates expects. Telegram
+# drops everything else server-side (and remembers the filter).
+ALLOWED_UPDATES = '["message","edited_message"]'
+
+# Tries for an idempotent API call that hits a transient error, with a
+# backoff that starts at RETRY_BACKOFF seconds and doubles per attempt
+API_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+
+# Longest 429 retry_after (seconds) waited out rather than failing the call
+MAX_RETRY_AFTER = 5.0
 
+# Multiplex requests over one connection when h2 is installed (`[http2]` extra)
+HTTP2_AVAILABLE = find_spec("h2") is not None
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class TelegramFile:
     """Represents a file from Telegram."""
+
     file_id: str
     file_unique_id: str
     file_path: Optional[str]
     file_size: int
 
 
+def _require_file_path(file_info: TelegramFile) -> str:
+    """Return file_info.file_path, which Telegram omits when it can't serve the file."""
+    if file_info.file_path is None:
+        raise ValueError(f"Telegram returned no file_path for file {file_info.file_id}")
+    return file_info.file_path
+
+
 class TelegramClient:
-    """Client for interacting with Telegram Bot API."""
+    """Client for interacting with Telegram Bot API.
+
+    The underlying HTTP client is pooled and kept alive between calls, so
+    use shared() rather than constructing one per request. Call aclose()
+    before the event loop that used it shuts down. The pool belongs to
+    one event loop; a call from another loop (e.g. a second asyncio.run)
+    starts a fresh pool.
+    """
+
+    _shared: Optional["TelegramClient"] = None
 
     def __init__(self, bot_token: Optional[str] = None):
         """Initialize the Telegram client.
@@ -29,10 +71,76 @@ class TelegramClient:
         self.config = get_config()
         self.bot_token = bot_token or self.config.bot_token
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self._http: Optional[httpx.AsyncClient] = None
+        # Event loop that _http's connections are bound to
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def shared(cls) -> "TelegramClient":
+        """Get the process-wide client, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
 
     def _get_client(self) -> httpx.AsyncClient:
-        """Get HTTP client. Timeout must exceed Telegram's long-poll timeout."""
-        return httpx.AsyncClient(timeout=35.0, proxy=None)
+        """Get the pooled HTTP client, creating it on first use.
+
+        Timeout must exceed Telegram's long-poll timeout.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            # A pool left from a finished loop can't be closed from this one;
+            # its sockets are released with it
+            self._http_loop = loop
+            self._http = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(35.0, connect=5.0),
+                proxy=None,
+                limits=httpx.Limits(
+                    max_connections=20,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=75.0,
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and its connections."""
+        if self._http is not None:
+            if self._http_loop is asyncio.get_running_loop():
+                await self._http.aclose()
+            self._http = None
+
+    async def _get_api(self, method: str, params: dict) -> httpx.Response:
+        """GET an idempotent Bot API method, retrying transient failures.
+
+        Connection errors, timeouts and 5xx responses (Telegram's 502 /
+        503 / 504 under load) are retried with exponential backoff; a 429
+        is retried after Telegram's retry_after when that is at most
+        MAX_RETRY_AFTER. The last response is returned as-is.
+        """
+        client = self._get_client()
+        url = f"{self.base_url}/{method}"
+        delay = RETRY_BACKOFF
+        for _ in range(API_ATTEMPTS - 1):
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError:
+                pass
+            else:
+                if response.status_code == 429:
+                    try:
+                        retry_after = loads(response.content)["parameters"]["retry_after"]
+                    except (JSONDecodeError, KeyError, TypeError):
+                        retry_after = delay
+                    if retry_after > MAX_RETRY_AFTER:
+                        return response
+                    delay = max(delay, retry_after)
+                elif response.status_code < 500:
+                    return response
+            await asyncio.sleep(delay)
+            delay *= 2
+        return await client.get(url, params=params)
 
     async def get_file(self, file_id: str) -> TelegramFile:
         """Get file info from Telegram.
@@ -46,26 +154,26 @@ class TelegramClient:
         Raises:
             httpx.HTTPStatusError: If the API returns an error.
         """
-        async with self._get_client() as client:
-            response = await client.get(f"{self.base_url}/getFile", params={
-                "file_id": file_id
-            })
-            response.raise_for_status()
-            data = response.json()
+        response = await self._get_api("getFile", {"file_id": file_id})
+        response.raise_for_status()
+        data = loads(response.content)
 
-            if not data.get("ok"):
-                raise ValueError(f"Telegram API error: {data.get('description')}")
+        if not data.get("ok"):
+            raise ValueError(f"Telegram API error: {data.get('description')}")
 
-            result = data["result"]
-            return TelegramFile(
-                file_id=result["file_id"],
-                file_unique_id=result["file_unique_id"],
-                file_path=result.get("file_path"),
-                file_size=result.get("file_size", 0),
-            )
+        result = data["result"]
+        return TelegramFile(
+            file_id=result["file_id"],
+            file_unique_id=result["file_unique_id"],
+            file_path=result.get("file_path"),
+            file_size=result.get("file_size", 0),
+        )
 
     async def download_file(self, file_path: str) -> bytes:
-        """Download file content from Telegram.
+        """Download file content from Telegram into memory.
+
+        Prefer iter_file / get_file_stream for anything that may be
+        large; this holds the whole file in memory.
 
         Args:
             file_path: The file_path from TelegramFile.
@@ -79,10 +187,49 @@ class TelegramClient:
         # Construct the full URL for file download
         file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
 
-        async with self._get_client() as client:
-            response = await client.get(file_url)
+        client = self._get_client()
+        response = await client.get(file_url)
+        response.raise_for_status()
+        return response.content
+
+    async def iter_file(self, file_path: str) -> AsyncGenerator[bytes, None]:
+        """Stream file content from Telegram in chunks.
+
+        Args:
+            file_path: The file_path from TelegramFile.
+
+        Yields:
+            Chunks of file content, at most DOWNLOAD_CHUNK_SIZE bytes each.
+
+        Raises:
+            httpx.HTTPStatusError: If the download fails.
+        """
+        file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+
+        client = self._get_client()
+        async with client.stream("GET", file_url) as response:
             response.raise_for_status()
-            return response.content
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+
+    async def get_file_stream(
+        self, file_id: str
+    ) -> tuple[TelegramFile, AsyncGenerator[bytes, None]]:
+        """Get file info and a chunk iterator over its content.
+
+        Unlike get_file_info, the content is never held in memory in full.
+
+        Args:
+            file_id: The file_id from the Telegram message.
+
+        Returns:
+            Tuple of (TelegramFile, chunk_iterator)
+
+        Raises:
+            ValueError: If Telegram sends no file_path for the file.
+        """
+        file_info = await self.get_file(file_id)
+        return file_info, self.iter_file(_require_file_path(file_info))
 
     async def get_file_info(self, file_id: str) -> tuple[TelegramFile, bytes]:
         """Get file info and download content.
@@ -92,9 +239,12 @@ class TelegramClient:
 
         Returns:
             Tuple of (TelegramFile, content_bytes)
+
+        Raises:
+            ValueError: If Telegram sends no file_path for the file.
         """
         file_info = await self.get_file(file_id)
-        content = await self.download_file(file_info.file_path)
+        content = await self.download_file(_require_file_path(file_info))
         return file_info, content
 
     async def get_updates(self, offset: int = 0, timeout: int = 5) -> list[dict]:
@@ -102,20 +252,24 @@ class TelegramClient:
 
         Args:
             offset: Set to last update_id + 1 to acknowledge processed updates.
-            timeout: Long-poll wait in seconds (0 = return immediately).
+            timeout: Long-poll wait in seconds (0 = return immediately,
+                at most MAX_POLL_TIMEOUT).
 
         Returns:
             List of raw Telegram update dicts.
         """
-        params: dict = {"timeout": timeout, "allowed_updates": ["message"]}
+        timeout = min(timeout, MAX_POLL_TIMEOUT)
+        params: dict = {"timeout": timeout, "allowed_updates": ALLOWED_UPDATES}
         if offset:
             params["offset"] = offset
 
         # httpx timeout must exceed the long-poll timeout
-        async with httpx.AsyncClient(timeout=timeout + 10.0, proxy=None) as client:
-            response = await client.get(f"{self.base_url}/getUpdates", params=params)
-            response.raise_for_status()
-            data = response.json()
+        client = self._get_client()
+        response = await client.get(
+            f"{self.base_url}/getUpdates", params=params, timeout=timeout + 10.0
+        )
+        response.raise_for_status()
+        data = loads(response.content)
 
         if not data.get("ok"):
             raise ValueError(f"Telegram API error: {data.get('description')}")
@@ -0,0 +1,17 @@
+"""Shared fixtures: every test gets its own workspace."""
+
+import pytest
+
+from telegram_media_hook.config import Config, set_config
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path):
+    """Point the config at a temporary workspace.
+
+    Queue state needs no reset: the read cache is keyed by the queue path,
+    and each test's group commits finish inside its own event loop.
+    """
+    set_config(Config(bot_token="test-token", workspace_root=tmp_path))
+    yield tmp_path
+    set_config(None)
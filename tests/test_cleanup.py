@@ -0,0 +1,41 @@
+"""Tests for the cleanup command, run where the queue shares the upload directory."""
+
+import os
+import time
+
+from telegram_media_hook import queue_service as qs
+from telegram_media_hook.__main__ import cli
+from telegram_media_hook.config import get_config
+
+
+def _backdate(path, days):
+    stamp = time.time() - days * 86400
+    os.utime(path, (stamp, stamp))
+
+
+def test_cleanup_keeps_queue_files(capsys):
+    qs.enqueue([qs.new_item("a")])
+    qs.compact()
+    qs.enqueue([qs.new_item("b")])
+
+    upload_dir = get_config().upload_path
+    old_upload = upload_dir / "20000101_000000_1f_0.jpg"
+    new_upload = upload_dir / "29990101_000000_1f_1.jpg"
+    other = upload_dir / "notes.txt"
+    for path in (old_upload, new_upload, other):
+        path.write_bytes(b"x")
+    queue_files = [
+        path for path in upload_dir.iterdir() if path.name.startswith("telegram_media_queue")
+    ]
+    assert queue_files
+    for path in [old_upload, other, *queue_files]:
+        _backdate(path, 60)
+
+    cli(["cleanup", "--max-age", "30"])
+
+    assert "Deleted 1 old files" in capsys.readouterr().out
+    assert not old_upload.exists()
+    assert new_upload.exists() and other.exists()
+    # The log was folded into the snapshot first, so nothing queued is lost
+    assert [item["file_id"] for item in qs.read_queue()["pending"]] == ["a", "b"]
+    assert qs.get_queue_path().exists()
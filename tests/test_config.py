@@ -0,0 +1,100 @@
+"""Tests for the built-in .env parser."""
+
+import logging
+import os
+
+import pytest
+
+from telegram_media_hook.config import load_env_file
+
+KEYS = [
+    "PLAIN",
+    "EXPORTED",
+    "SINGLE",
+    "DOUBLE",
+    "COMMENTED",
+    "QUOTED_COMMENT",
+    "HASH",
+    "EMPTY",
+    "SPACED",
+    "INTERP",
+    "ESCAPED",
+    "MULTI",
+    "AFTER",
+    "LITERAL",
+    "PRESET",
+]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Write a .env file and load it; monkeypatch restores os.environ after."""
+    for key in KEYS:
+        monkeypatch.delenv(key, raising=False)
+
+    def load(text):
+        path = tmp_path / ".env"
+        path.write_text(text)
+        load_env_file(path)
+        return {key: os.environ[key] for key in KEYS if key in os.environ}
+
+    return load
+
+
+def test_parses_supported_syntax(env):
+    loaded = env(
+        "# comment\n"
+        "\n"
+        "PLAIN=value\n"
+        "export EXPORTED=1\n"
+        "SINGLE='single # not a comment'\n"
+        'DOUBLE="double"\n'
+        "COMMENTED=value # comment\n"
+        "QUOTED_COMMENT='quoted' # comment\n"
+        "HASH=a#b\n"
+        "EMPTY=\n"
+        "  SPACED  =  padded  \n"
+        "LITERAL='${NOT_EXPANDED}'\n"
+        "not a key value line\n"
+    )
+
+    assert loaded == {
+        "PLAIN": "value",
+        "EXPORTED": "1",
+        "SINGLE": "single # not a comment",
+        "DOUBLE": "double",
+        "COMMENTED": "value",
+        "QUOTED_COMMENT": "quoted",
+        "HASH": "a#b",
+        "EMPTY": "",
+        "SPACED": "padded",
+        "LITERAL": "${NOT_EXPANDED}",
+    }
+
+
+def test_existing_environment_wins(env, monkeypatch):
+    monkeypatch.setenv("PRESET", "from environment")
+
+    assert env("PRESET=from file\n")["PRESET"] == "from environment"
+
+
+def test_unsupported_constructs_are_skipped_with_a_warning(env, caplog):
+    with caplog.at_level(logging.WARNING):
+        loaded = env(
+            "INTERP=${HOME}/x\n"
+            'ESCAPED="line\\nbreak"\n'
+            'MULTI="first\n'
+            "OTHER=inside the multi-line value\n"
+            'last"\n'
+            "AFTER=ok\n"
+        )
+
+    assert loaded == {"AFTER": "ok"}
+    assert "OTHER" not in os.environ
+    messages = " ".join(record.getMessage() for record in caplog.records)
+    for key in ("INTERP", "ESCAPED", "MULTI"):
+        assert key in messages
+
+
+def test_missing_file_is_ignored(tmp_path):
+    load_env_file(tmp_path / "missing.env")
@@ -0,0 +1,81 @@
+"""Tests for saving streamed media into the workspace."""
+
+import os
+
+import pytest
+
+from telegram_media_hook import file_manager
+from telegram_media_hook.file_manager import FileManager
+
+
+async def _chunks(*parts, error=None):
+    for part in parts:
+        yield part
+    if error is not None:
+        raise error
+
+
+async def test_save_stream_writes_all_chunks(workspace, monkeypatch):
+    # Force several buffered writes
+    monkeypatch.setattr(file_manager, "WRITE_BUFFER_SIZE", 4)
+    manager = FileManager()
+    filename = manager.generate_filename("clip.MP4")
+
+    path = await manager.save_stream(_chunks(b"ab", b"cdef", b"g", b"hij"), filename)
+
+    assert path == workspace / "uploads" / filename
+    assert path.suffix == ".mp4"
+    assert path.read_bytes() == b"abcdefghij"
+    assert manager.get_workspace_relative_path(path) == f"uploads/{filename}"
+
+
+async def test_save_stream_removes_partial_file_when_stream_fails(workspace):
+    manager = FileManager()
+    filename = manager.generate_filename("photo.jpg")
+
+    with pytest.raises(ConnectionError):
+        await manager.save_stream(_chunks(b"partial", error=ConnectionError("reset")), filename)
+
+    assert not manager.get_file_path(filename).exists()
+
+
+def test_generated_names_are_unique():
+    manager = FileManager()
+
+    names = {manager.generate_filename("a.jpg") for _ in range(100)}
+    assert len(names) == 100
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+async def test_write_failure_closes_stream_and_removes_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_manager, "WRITE_BUFFER_SIZE", 1)
+    closed = []
+
+    async def chunks():
+        try:
+            while True:
+                yield b"x"
+        finally:
+            closed.append(True)
+
+    # Writes to /dev/full fail with ENOSPC; only the link is removed
+    path = tmp_path / "full"
+    path.symlink_to("/dev/full")
+    with pytest.raises(OSError):
+        await file_manager.write_stream(chunks(), path)
+
+    assert closed == [True]
+    assert not path.is_symlink()
+
+
+async def test_stream_is_closed_after_success(tmp_path):
+    closed = []
+
+    async def chunks():
+        try:
+            yield b"data"
+        finally:
+            closed.append(True)
+
+    assert await file_manager.write_stream(chunks(), tmp_path / "out") == 4
+    assert closed == [True]
@@ -0,0 +1,220 @@
+"""Tests for the OpenClaw hook: media detection, downloads and the redelivery cache."""
+
+import asyncio
+import itertools
+
+import pytest
+
+from telegram_media_hook import hook
+from telegram_media_hook.hook import TelegramMediaHook, find_media, process_telegram_update
+from telegram_media_hook.telegram_client import TelegramClient, TelegramFile
+
+_chat_ids = itertools.count(1000)
+
+
+class FakeTelegram:
+    """Stands in for TelegramClient; counts and optionally holds downloads."""
+
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.failing = set()
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def get_file_stream(self, file_id):
+        self.calls.append(file_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.gate.wait()
+        finally:
+            self.active -= 1
+        if file_id in self.failing:
+            raise RuntimeError(f"download of {file_id} failed")
+
+        async def chunks():
+            yield f"content of {file_id}".encode()
+
+        return TelegramFile(file_id, file_id, f"photos/{file_id}.jpg", 0), chunks()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    fake = FakeTelegram()
+    monkeypatch.setattr(TelegramClient, "shared", staticmethod(lambda: fake))
+    return fake
+
+
+@pytest.fixture
+def chat_id():
+    # The redelivery cache is process-wide, so each test uses its own chat
+    return next(_chat_ids)
+
+
+def _update(chat_id, message_id=1, caption="hello", file_id="f1", **fields):
+    return {
+        "update_id": message_id,
+        "message": {
+            "message_id": message_id,
+            "chat": {"id": chat_id},
+            "caption": caption,
+            "photo": [{"file_id": "small"}, {"file_id": file_id}],
+            **fields,
+        },
+    }
+
+
+async def test_handle_update_downloads_and_rewrites(telegram, chat_id, workspace):
+    result = await process_telegram_update(_update(chat_id))
+
+    assert telegram.calls == ["f1"]
+    assert result.original_message == "hello"
+    assert result.media_info.file_type == "photo"
+    assert result.rewritten_message.startswith("hello\n\n📎 ")
+    assert result.rewritten_message.endswith(result.media_info.workspace_path)
+    saved = workspace / result.media_info.workspace_path
+    assert saved.read_bytes() == b"content of f1"
+
+
+async def test_handle_update_without_media(telegram, chat_id):
+    assert await process_telegram_update({"update_id": 1}) is None
+    update = {"message": {"message_id": 1, "chat": {"id": chat_id}, "text": "hi"}}
+    assert await process_telegram_update(update) is None
+    assert telegram.calls == []
+
+
+async def test_redelivery_is_answered_from_cache(telegram, chat_id):
+    first = await process_telegram_update(_update(chat_id))
+    second = await process_telegram_update(_update(chat_id))
+
+    assert second is first
+    assert telegram.calls == ["f1"]
+
+
+async def test_concurrent_duplicate_shares_the_download(telegram, chat_id):
+    telegram.gate.clear()
+    waiting = [asyncio.ensure_future(process_telegram_update(_update(chat_id))) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    telegram.gate.set()
+
+    first, second = await asyncio.gather(*waiting)
+    assert first is second
+    assert telegram.calls == ["f1"]
+
+
+async def test_failed_download_is_retried_on_redelivery(telegram, chat_id):
+    telegram.failing.add("f1")
+    with pytest.raises(RuntimeError):
+        await process_telegram_update(_update(chat_id))
+
+    telegram.failing.clear()
+    result = await process_telegram_update(_update(chat_id))
+    assert result.media_info.file_id == "f1"
+    assert telegram.calls == ["f1", "f1"]
+
+
+async def test_edited_caption_is_processed_again(telegram, chat_id):
+    await process_telegram_update(_update(chat_id, caption="old"))
+    edit = _update(chat_id, caption="new", edit_date=1700000000)
+    edit["edited_message"] = edit.pop("message")
+
+    result = await process_telegram_update(edit)
+
+    assert result.original_message == "new"
+    assert result.rewritten_message.startswith("new\n\n")
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_download(telegram, chat_id):
+    telegram.gate.clear()
+    first = asyncio.ensure_future(process_telegram_update(_update(chat_id)))
+    second = asyncio.ensure_future(process_telegram_update(_update(chat_id)))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    telegram.gate.set()
+
+    result = await asyncio.wait_for(second, 5)
+    assert result.media_info.file_id == "f1"
+    assert first.cancelled()
+    assert telegram.calls == ["f1"]
+
+
+async def test_handle_updates_returns_each_result_or_error(telegram, chat_id):
+    telegram.failing.add("bad")
+    updates = [
+        _update(chat_id, 1, file_id="a"),
+        {"update_id": 2},
+        _update(chat_id, 3, file_id="bad"),
+        _update(chat_id, 4, file_id="b"),
+    ]
+
+    results = await TelegramMediaHook().handle_updates(updates)
+
+    assert results[0].media_info.file_id == "a"
+    assert results[1] is None
+    assert isinstance(results[2], RuntimeError)
+    assert results[3].media_info.file_id == "b"
+
+
+async def test_download_limit_is_shared_across_hooks(telegram, chat_id, monkeypatch):
+    monkeypatch.setattr(hook, "MAX_CONCURRENT_DOWNLOADS", 2)
+    telegram.gate.clear()
+    # process_telegram_update() makes a new hook per update
+    tasks = [
+        asyncio.ensure_future(process_telegram_update(_update(chat_id, i, file_id=f"f{i}")))
+        for i in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    assert telegram.active == 2
+
+    telegram.gate.set()
+    await asyncio.gather(*tasks)
+    assert telegram.max_active == 2
+    assert len(telegram.calls) == 5
+
+
+def test_find_media_picks_largest_photo_and_keeps_priority_order():
+    message = {
+        "document": {"file_id": "doc", "file_name": "a.pdf"},
+        "photo": [{"file_id": "small"}, {"file_id": "large"}],
+    }
+
+    assert find_media(message) == [
+        ("photo", {"file_id": "large"}),
+        ("document", {"file_id": "doc", "file_name": "a.pdf"}),
+    ]
+
+
+def test_find_media_skips_document_copy_of_animation():
+    gif = {"file_id": "gif"}
+
+    assert find_media({"animation": gif, "document": dict(gif)}) == [("animation", gif)]
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        None,
+        "text",
+        {"photo": []},
+        {"photo": {"file_id": "x"}},
+        {"video": {"file_unique_id": "no file_id"}},
+        {"document": ["x"]},
+    ],
+)
+def test_find_media_rejects_malformed(message):
+    assert find_media(message) is None
+
+
+def test_find_media_without_media():
+    assert find_media({"text": "hi"}) == []
+
+
+async def test_malformed_update_is_skipped(telegram, chat_id):
+    update = {"message": {"message_id": 1, "chat": {"id": chat_id}, "photo": "oops"}}
+
+    assert await process_telegram_update(update) is None
+    assert telegram.calls == []
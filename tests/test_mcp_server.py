@@ -0,0 +1,134 @@
+"""Tests for the MCP server's Telegram polling and fetch tools."""
+
+import asyncio
+
+import pytest
+
+from telegram_media_hook import mcp_server
+from telegram_media_hook.queue_service import enqueue, locked_queue, new_item, read_queue
+from telegram_media_hook.telegram_client import TelegramClient, TelegramFile
+
+
+class FakeTelegram:
+    """Stands in for TelegramClient: serves queued update batches and files."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.polls = []
+        self.downloads = []
+        self.failing = set()
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def get_updates(self, offset=0, timeout=5):
+        self.polls.append((offset, timeout))
+        return self.batches.pop(0) if self.batches else []
+
+    async def get_file_stream(self, file_id):
+        self.downloads.append(file_id)
+        await self.gate.wait()
+        if file_id in self.failing:
+            raise RuntimeError("Bad Request: file is too big")
+
+        async def chunks():
+            yield b"data"
+
+        return TelegramFile(file_id, file_id, f"photos/{file_id}.jpg", 4), chunks()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    fake = FakeTelegram()
+    monkeypatch.setattr(TelegramClient, "shared", staticmethod(lambda: fake))
+    return fake
+
+
+def _photo(update_id, file_id, key="message", caption="", **fields):
+    return {
+        "update_id": update_id,
+        key: {
+            "message_id": update_id,
+            "chat": {"id": 7},
+            "caption": caption,
+            "photo": [{"file_id": file_id}],
+            **fields,
+        },
+    }
+
+
+def _pending_ids():
+    return [item["file_id"] for item in read_queue()["pending"]]
+
+
+async def test_edited_caption_does_not_requeue_downloaded_media(telegram):
+    enqueue([new_item("f1")])
+    with locked_queue() as queue:
+        queue["processed"].append(queue["pending"].pop())
+    telegram.batches = [
+        [
+            _photo(5, "f1", key="edited_message", caption="new", edit_date=1),
+            _photo(6, "f2", key="edited_message", caption="edited before fetch", edit_date=1),
+        ]
+    ]
+
+    assert await mcp_server._poll_updates(telegram, 0) == 1
+    assert _pending_ids() == ["f2"]
+
+
+async def test_fetch_downloads_pending_and_records_results(telegram, workspace):
+    telegram.failing.add("broken")
+    enqueue([new_item("f1", caption="cat"), new_item("broken")])
+
+    result = await mcp_server.fetch_telegram_media()
+
+    assert result["count"] == 1
+    [entry] = result["fetched"]
+    assert (entry["id"], entry["caption"]) == ("f1", "cat")
+    assert (workspace / entry["workspace_path"]).read_bytes() == b"data"
+    queue = read_queue()
+    assert [item["file_id"] for item in queue["processed"]] == ["f1"]
+    # Failed downloads stay pending until they run out of retries
+    [broken] = queue["pending"]
+    assert (broken["file_id"], broken["retry_count"]) == ("broken", 1)
+
+
+async def test_overlapping_fetches_download_each_item_once(telegram):
+    enqueue([new_item("f1"), new_item("f2")])
+    telegram.gate.clear()
+
+    first = asyncio.ensure_future(mcp_server.fetch_telegram_media())
+    second = asyncio.ensure_future(mcp_server.poll_telegram(timeout=0))
+    await asyncio.sleep(0.01)
+    telegram.gate.set()
+    results = await asyncio.gather(first, second)
+
+    assert sorted(telegram.downloads) == ["f1", "f2"]
+    assert [r["count"] for r in results] == [2, 0]
+    assert _pending_ids() == []
+
+
+async def test_poll_acknowledges_updates_without_media_and_keeps_waiting(telegram):
+    telegram.batches = [
+        [{"update_id": 10, "message": {"message_id": 1, "text": "hi"}}],
+        [_photo(11, "f1", caption="look")],
+    ]
+
+    assert await mcp_server._poll_updates(telegram, 20) == 1
+
+    assert [offset for offset, _ in telegram.polls] == [0, 11]
+    assert all(0 < timeout <= 20 for _, timeout in telegram.polls)
+    assert mcp_server._read_offset() == 12
+    [item] = read_queue()["pending"]
+    assert (item["file_id"], item["caption"], item["chat_id"]) == ("f1", "look", 7)
+
+
+async def test_poll_with_zero_timeout_polls_once(telegram):
+    assert await mcp_server._poll_updates(telegram, 0) == 0
+    assert telegram.polls == [(0, 0)]
+
+
+def test_write_offset_never_moves_back():
+    mcp_server._write_offset(5)
+    mcp_server._write_offset(3)
+
+    assert mcp_server._read_offset() == 5
@@ -0,0 +1,53 @@
+"""Tests for the Gateway-facing queue HTTP API."""
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from telegram_media_hook import queue_service
+from telegram_media_hook.queue_api import create_app
+from telegram_media_hook.queue_service import locked_queue, read_queue
+
+
+@pytest.fixture
+async def client():
+    async with TestClient(TestServer(create_app())) as client:
+        yield client
+
+
+async def test_add_and_dedupe(client):
+    response = await client.post("/add", json={"file_id": "abc", "caption": "hi"})
+    assert await response.json() == {"ok": True, "file_id": "abc"}
+
+    response = await client.post("/add", json={"file_id": "abc"})
+    assert await response.json() == {"ok": True, "message": "Already in queue"}
+    assert [item["caption"] for item in read_queue()["pending"]] == ["hi"]
+
+
+async def test_add_numeric_file_id_is_stored_as_string(client):
+    response = await client.post("/add", json={"file_id": 12345})
+
+    assert response.status == 200
+    assert await response.json() == {"ok": True, "file_id": "12345"}
+    assert read_queue()["pending"][0]["file_id"] == "12345"
+
+
+@pytest.mark.parametrize(
+    "body", [{}, {"file_id": ""}, {"file_id": ["x"]}, ["x"], {"file_id": True}]
+)
+async def test_add_rejects_bad_file_id(client, body):
+    response = await client.post("/add", json=body)
+
+    assert response.status == 400
+    assert read_queue()["pending"] == []
+
+
+async def test_status_processed_count_includes_archived(client, monkeypatch):
+    monkeypatch.setattr(queue_service, "HISTORY_LIMIT", 2)
+    with locked_queue() as queue:
+        queue["processed"] = [{"file_id": str(i), "marked_at": "x"} for i in range(5)]
+
+    response = await client.get("/status")
+
+    body = await response.json()
+    assert body["processed_count"] == 5
+    assert len(read_queue()["processed"]) == 2
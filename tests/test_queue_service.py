@@ -0,0 +1,241 @@
+"""Tests for the shared file queue: log, snapshots, history and group commit."""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from telegram_media_hook import queue_service as qs
+from telegram_media_hook.serialization import dumps, loads
+
+
+def _ids(items):
+    return [item["file_id"] for item in items]
+
+
+def _paths():
+    """(queue, log, archive, history) file paths, as documented in queue_service."""
+    queue_path = qs.get_queue_path()
+    return (
+        queue_path,
+        queue_path.with_suffix(".log"),
+        queue_path.with_suffix(".archive"),
+        queue_path.with_suffix(".history.json"),
+    )
+
+
+def test_enqueue_appends_to_log_and_replays():
+    queue_path, log, _, _ = _paths()
+
+    assert qs.enqueue([qs.new_item("a"), qs.new_item("b"), qs.new_item("a")]) == [True, True, False]
+    assert qs.enqueue([qs.new_item("b")]) == [False]
+
+    # Adds only touch the log until something compacts
+    assert not queue_path.exists()
+    assert len(log.read_bytes().splitlines()) == 2
+    assert _ids(qs.read_queue()["pending"]) == ["a", "b"]
+
+
+def test_replay_skips_stale_generation_and_torn_lines():
+    queue_path, log, _, _ = _paths()
+    qs.enqueue([qs.new_item("a")])
+    assert qs.compact() == (1, 0)
+    assert loads(queue_path.read_bytes())["generation"] == 1
+
+    # A record from before the snapshot was written (crash before the log
+    # was removed) must not be applied twice; a torn tail is ignored
+    with open(log, "ab") as f:
+        f.write(dumps({"op": "add", "item": qs.new_item("stale"), "gen": 0}) + b"\n")
+        f.write(dumps({"op": "add", "item": qs.new_item("b"), "gen": 1}) + b"\n")
+        f.write(b'{"op": "add", "ite')
+
+    assert _ids(qs.read_queue()["pending"]) == ["a", "b"]
+
+
+def test_compact_folds_log_into_snapshot():
+    queue_path, log, _, history = _paths()
+    qs.enqueue([qs.new_item("a")])
+    assert qs.mark_processed("missing", "now") is False
+
+    assert qs.compact() == (1, 0)
+    assert not log.exists()
+    assert _ids(loads(queue_path.read_bytes())["pending"]) == ["a"]
+    assert loads(history.read_bytes()) == {"processed": [], "failed": [], "archived_processed": 0}
+
+
+def test_enqueue_compacts_after_threshold(monkeypatch):
+    queue_path, log, _, _ = _paths()
+    monkeypatch.setattr(qs, "COMPACT_AFTER", 3)
+
+    qs.enqueue([qs.new_item("a"), qs.new_item("b")])
+    assert log.exists()
+    qs.enqueue([qs.new_item("c")])
+
+    assert not log.exists()
+    assert _ids(loads(queue_path.read_bytes())["pending"]) == ["a", "b", "c"]
+
+
+def test_locked_queue_skips_unchanged_write():
+    queue_path, _, _, _ = _paths()
+    qs.enqueue([qs.new_item("a")])
+    qs.compact()
+    before = os.stat(queue_path)
+
+    with qs.locked_queue() as queue:
+        assert _ids(queue["pending"]) == ["a"]
+
+    after = os.stat(queue_path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_locked_queue_writes_changes_and_mark():
+    qs.enqueue([qs.new_item("a"), qs.new_item("b")])
+
+    with qs.locked_queue() as queue:
+        queue["processed"].append(queue["pending"].pop(0))
+
+    assert qs.mark_processed("a", "2024-01-01T00:00:00")
+    queue = qs.read_queue()
+    assert _ids(queue["pending"]) == ["b"]
+    assert queue["processed"][0]["marked_at"] == "2024-01-01T00:00:00"
+
+
+def test_reads_legacy_single_file_snapshot():
+    queue_path, _, _, history = _paths()
+    queue_path.parent.mkdir(parents=True)
+    queue_path.write_bytes(
+        dumps(
+            {
+                "pending": [{"file_id": "p"}],
+                "processed": [{"file_id": "x"}],
+                "failed": [{"file_id": "f"}],
+            }
+        )
+    )
+
+    queue = qs.read_queue()
+    assert (_ids(queue["pending"]), _ids(queue["processed"]), _ids(queue["failed"])) == (
+        ["p"],
+        ["x"],
+        ["f"],
+    )
+
+    qs.compact()
+    assert "processed" not in loads(queue_path.read_bytes())
+    assert _ids(loads(history.read_bytes())["processed"]) == ["x"]
+
+
+def test_history_trim_archives_oldest_marked(monkeypatch):
+    _, _, archive, _ = _paths()
+    monkeypatch.setattr(qs, "HISTORY_LIMIT", 2)
+
+    with qs.locked_queue() as queue:
+        queue["processed"] = [
+            {"file_id": "unmarked"},
+            {"file_id": "old", "marked_at": "x"},
+            {"file_id": "mid", "marked_at": "x"},
+            {"file_id": "new", "marked_at": "x"},
+        ]
+        queue["failed"] = [{"file_id": f"f{i}"} for i in range(3)]
+
+    queue = qs.read_queue()
+    # Unmarked items are still listed by list_pending_media, so they stay
+    assert _ids(queue["processed"]) == ["unmarked", "new"]
+    assert _ids(queue["failed"]) == ["f1", "f2"]
+    records = [loads(line) for line in archive.read_bytes().splitlines()]
+    assert [(r["list"], r["item"]["file_id"]) for r in records] == [
+        ("failed", "f0"),
+        ("processed", "old"),
+        ("processed", "mid"),
+    ]
+    assert queue["archived_processed"] == 2
+
+
+def test_compact_expires_history_by_age():
+    now = time.time()
+    with qs.locked_queue() as queue:
+        queue["processed"] = [
+            {"file_id": "old", "finished_ts": now - 40 * 86400, "marked_at": "x"},
+            {"file_id": "old-unmarked", "finished_ts": now - 40 * 86400},
+            {"file_id": "new", "finished_ts": now, "marked_at": "x"},
+        ]
+        # Legacy entries without finished_ts are not in finish order
+        queue["failed"] = [
+            {"file_id": "recent", "queued_at": "2999-01-01T00:00:00"},
+            {"file_id": "ancient", "queued_at": "2000-01-01T00:00:00"},
+            {"file_id": "garbled", "queued_at": "not a date"},
+        ]
+
+    assert qs.compact(max_age_days=30) == (0, 3)
+    queue = qs.read_queue()
+    assert _ids(queue["processed"]) == ["old-unmarked", "new"]
+    assert _ids(queue["failed"]) == ["recent"]
+
+
+def test_lock_file_replaced_is_reopened():
+    qs.enqueue([qs.new_item("a")])
+    lock = qs.get_queue_path().with_suffix(".lock")
+    lock.unlink()
+
+    qs.enqueue([qs.new_item("b")])
+
+    if qs.fcntl is not None:
+        assert os.fstat(qs._lock_fds[lock]).st_ino == os.stat(lock).st_ino
+    assert _ids(qs.read_queue()["pending"]) == ["a", "b"]
+
+
+async def test_enqueue_async_shares_one_write():
+    results = await asyncio.gather(
+        qs.enqueue_async(qs.new_item("a")),
+        qs.enqueue_async(qs.new_item("b")),
+        qs.enqueue_async(qs.new_item("a")),
+    )
+
+    assert results == [True, True, False]
+    _, log, _, _ = _paths()
+    assert len(log.read_bytes().splitlines()) == 2
+
+
+async def test_enqueue_async_cancelled_waiter_does_not_block_others():
+    first = asyncio.create_task(qs.enqueue_async(qs.new_item("a")))
+    second = asyncio.create_task(qs.enqueue_async(qs.new_item("b")))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await asyncio.wait_for(second, 5) is True
+    assert first.cancelled()
+
+
+async def test_enqueue_async_cancelled_flush_resolves_waiters():
+    waiter = asyncio.create_task(qs.enqueue_async(qs.new_item("a")))
+    await asyncio.sleep(0)
+    qs._flush_task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(waiter, 5)
+    assert qs._flush_task is None and qs._batch == []
+    assert await qs.enqueue_async(qs.new_item("b")) is True
+
+
+async def test_enqueue_async_bad_item_fails_only_its_own_call():
+    results = await asyncio.gather(
+        qs.enqueue_async(qs.new_item("a")),
+        # An unhashable file_id can't be deduped, so enqueue() raises
+        qs.enqueue_async({"file_id": ["bad"]}),
+        qs.enqueue_async(qs.new_item("b")),
+        return_exceptions=True,
+    )
+
+    assert results[0] is True and results[2] is True
+    assert isinstance(results[1], TypeError)
+    assert _ids(qs.read_queue()["pending"]) == ["a", "b"]
+
+
+def test_unreadable_history_file_is_treated_as_empty():
+    _, _, _, history = _paths()
+    qs.enqueue([qs.new_item("a")])
+    history.write_bytes(b"[]")
+
+    queue = qs.read_queue()
+    assert (_ids(queue["pending"]), queue["processed"]) == (["a"], [])
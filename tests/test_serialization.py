@@ -0,0 +1,75 @@
+"""Tests that the orjson and standard library JSON paths behave the same."""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from telegram_media_hook import serialization
+from telegram_media_hook.serialization import JSONDecodeError, dumps, loads
+
+
+@dataclass
+class Inner:
+    name: str
+
+
+@dataclass
+class Outer:
+    inner: Inner
+    tags: list[str]
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_dumps_returns_utf8_bytes(backend):
+    data = dumps({"caption": "图片 ✓", "n": 1, "ok": True, "none": None})
+
+    assert isinstance(data, bytes)
+    assert "图片 ✓".encode() in data
+    assert json.loads(data) == {"caption": "图片 ✓", "n": 1, "ok": True, "none": None}
+
+
+def test_dumps_encodes_dataclasses_and_unknown_types(backend):
+    obj = {"outer": Outer(Inner("a"), ["x"]), "path": Path("/tmp/x")}
+
+    assert json.loads(dumps(obj)) == {
+        "outer": {"inner": {"name": "a"}, "tags": ["x"]},
+        "path": "/tmp/x",
+    }
+
+
+def test_dumps_indent(backend):
+    data = dumps({"a": [1]}, indent=True)
+
+    assert data.decode() == '{\n  "a": [\n    1\n  ]\n}'
+
+
+def test_compact_output_matches_between_backends(monkeypatch):
+    obj = {"pending": [{"file_id": "f", "caption": "é"}], "generation": 3}
+    fast = dumps(obj)
+    monkeypatch.setattr(serialization, "orjson", None)
+
+    # Key order and values match; only insignificant whitespace may differ
+    assert json.loads(dumps(obj)) == json.loads(fast)
+    assert list(loads(dumps(obj))) == list(loads(fast))
+
+
+@pytest.mark.parametrize("data", [b'{"a": "\xc3\xa9"}', '{"a": "é"}'])
+def test_loads_accepts_bytes_and_str(backend, data):
+    assert loads(data) == {"a": "é"}
+
+
+@pytest.mark.parametrize("data", [b"", b"{", b'{"a": 1}x'])
+def test_loads_errors_are_json_decode_errors(backend, data):
+    with pytest.raises(JSONDecodeError):
+        loads(data)
@@ -0,0 +1,129 @@
+"""Tests for the Telegram Bot API client, against a mocked HTTP transport."""
+
+import httpx
+import pytest
+
+from telegram_media_hook import telegram_client
+from telegram_media_hook.telegram_client import TelegramClient
+
+
+class FakeTelegramAPI:
+    """Serves queued responses (or raises queued exceptions) in order."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeTelegramAPI()
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        httpx,
+        "AsyncClient",
+        lambda **kwargs: real_client(**kwargs, transport=httpx.MockTransport(fake)),
+    )
+    monkeypatch.setattr(telegram_client, "RETRY_BACKOFF", 0.0)
+    return fake
+
+
+@pytest.fixture
+async def client():
+    client = TelegramClient("token")
+    yield client
+    await client.aclose()
+
+
+def _file(file_path="photos/file_1.jpg"):
+    result = {"file_id": "f", "file_unique_id": "u", "file_size": 3}
+    if file_path:
+        result["file_path"] = file_path
+    return httpx.Response(200, json={"ok": True, "result": result})
+
+
+async def test_get_file(api, client):
+    api.responses = [_file()]
+
+    info = await client.get_file("f")
+
+    assert (info.file_id, info.file_path, info.file_size) == ("f", "photos/file_1.jpg", 3)
+    assert api.requests[0].url.path == "/bottoken/getFile"
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+async def test_get_api_retries_server_errors(api, client, status):
+    api.responses = [httpx.Response(status), _file()]
+
+    assert (await client.get_file("f")).file_id == "f"
+    assert len(api.requests) == 2
+
+
+async def test_get_api_retries_transport_errors(api, client):
+    api.responses = [httpx.ConnectError("reset"), httpx.ReadTimeout("slow"), _file()]
+
+    assert (await client.get_file("f")).file_id == "f"
+    assert len(api.requests) == 3
+
+
+async def test_get_api_gives_up_after_attempts(api, client):
+    api.responses = [httpx.Response(502)] * telegram_client.API_ATTEMPTS
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_file("f")
+    assert len(api.requests) == telegram_client.API_ATTEMPTS
+
+
+async def test_get_api_waits_out_short_retry_after(api, client, monkeypatch):
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(telegram_client.asyncio, "sleep", sleep)
+    too_many = {"ok": False, "parameters": {"retry_after": 2}}
+    api.responses = [httpx.Response(429, json=too_many), _file()]
+
+    assert (await client.get_file("f")).file_id == "f"
+    assert slept == [2]
+
+
+async def test_get_api_returns_long_retry_after(api, client):
+    too_many = {"ok": False, "parameters": {"retry_after": 60}}
+    api.responses = [httpx.Response(429, json=too_many)]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_file("f")
+    assert len(api.requests) == 1
+
+
+async def test_get_api_does_not_retry_client_errors(api, client):
+    api.responses = [httpx.Response(400, json={"ok": False})]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_file("f")
+    assert len(api.requests) == 1
+
+
+async def test_get_file_stream_streams_content(api, client):
+    api.responses = [_file(), httpx.Response(200, content=b"abc")]
+
+    info, chunks = await client.get_file_stream("f")
+
+    assert b"".join([chunk async for chunk in chunks]) == b"abc"
+    assert api.requests[1].url.path == "/file/bottoken/photos/file_1.jpg"
+
+
+async def test_get_file_stream_without_file_path(api, client):
+    api.responses = [_file(file_path=None)]
+
+    with pytest.raises(ValueError, match="no file_path"):
+        await client.get_file_stream("f")
+    assert len(api.requests) == 1